@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк времени запуска
+
+Каждый сценарий запускается в отдельном процессе несколько раз; из медианы
+вычитается время запуска пустого интерпретатора. Скрипт завершается с кодом 1,
+если сценарий превысил бюджет или загрузил тяжелые зависимости (cv2, numpy, PIL),
+которые должны импортироваться лениво.
+
+    python bench_startup.py            # проверка бюджета
+    python bench_startup.py --runs 15  # больше запусков для стабильности
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ("cv2", "numpy", "PIL")
+
+# Сценарий -> (код, бюджет в мс сверх пустого интерпретатора)
+SCENARIOS = {
+    "import colager.core": ("import colager.core", 40),
+    "import test_program": ("import test_program", 40),
+    "import video_collage_creator": ("import video_collage_creator", 60),
+    "import video_collage_improved": ("import video_collage_improved", 60),
+    "import video_collage_server": ("import video_collage_server", 150),
+    "video_collage_creator --help": (
+        "import sys, runpy; sys.argv = ['video_collage_creator.py', '--help']\n"
+        "try:\n    runpy.run_path('video_collage_creator.py', run_name='__main__')\n"
+        "except SystemExit:\n    pass",
+        80,
+    ),
+}
+
+# GUI проверяется только если tkinter доступен (окно не создается)
+try:
+    import tkinter  # noqa: F401
+    SCENARIOS["import video_collage_gui"] = ("import video_collage_gui", 120)
+except ImportError:
+    pass
+
+PROBE = "\nimport sys, json\nprint(json.dumps([m for m in {heavy!r} if m in sys.modules]))"
+
+
+def run_once(code):
+    """Запускает код в новом процессе и возвращает (время в мс, загруженные тяжелые модули)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code + PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed, loaded
+
+
+def measure(code, runs):
+    times = []
+    loaded = []
+    for _ in range(runs):
+        elapsed, loaded = run_once(code)
+        times.append(elapsed)
+    return statistics.median(times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени запуска")
+    parser.add_argument("--runs", type=int, default=7, help="Количество запусков на сценарий")
+    args = parser.parse_args()
+
+    baseline, _ = measure("pass", args.runs)
+    print(f"Пустой интерпретатор: {baseline:.1f} мс")
+    print("=" * 60)
+
+    failures = 0
+    for name, (code, budget) in SCENARIOS.items():
+        try:
+            median, loaded = measure(code, args.runs)
+        except RuntimeError as e:
+            print(f"❌ {name}: ошибка запуска\n   {e}")
+            failures += 1
+            continue
+        overhead = median - baseline
+        ok = overhead <= budget and not loaded
+        status = "✅" if ok else "❌"
+        print(f"{status} {name}: {overhead:.1f} мс (бюджет {budget} мс)")
+        if loaded:
+            print(f"   Загружены тяжелые модули: {', '.join(loaded)}")
+        if not ok:
+            failures += 1
+
+    print("=" * 60)
+    if failures:
+        print(f"Превышен бюджет запуска: {failures}")
+        return 1
+    print("Все сценарии укладываются в бюджет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Общее ядро программы создания коллажей из видео
+
+Тяжелые зависимости (OpenCV, NumPy, Pillow) загружаются лениво — при первом
+обращении, поэтому импорт пакета, вывод справки и запуск окна GUI происходят быстро.
+"""
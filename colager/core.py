@@ -0,0 +1,309 @@
+"""
+Извлечение скриншотов и сборка коллажей — общий код для консольных версий, GUI и HTTP-сервиса
+"""
+
+import os
+import math
+import contextlib
+
+from colager.lazy import cv2, np, Image
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
+
+def resample_filter():
+    """Фильтр LANCZOS с учетом версии Pillow"""
+    try:
+        return Image.Resampling.LANCZOS
+    except AttributeError:
+        return 1  # LANCZOS/ANTIALIAS для старых Pillow
+
+def get_file_size(file_path):
+    """Получает размер файла в читаемом формате"""
+    return format_size(os.path.getsize(file_path))
+
+def format_size(size):
+    """Форматирует размер в байтах в читаемый вид"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+def get_video_duration(video_path):
+    """Получает длительность видео в секундах (0, если видео не удалось прочитать)"""
+    try:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            return 0
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        duration = frame_count / fps
+        cap.release()
+        return duration
+    except Exception:
+        return 0
+
+# Ограничения на восстановление после ошибок чтения кадров:
+# не больше RETRY_ATTEMPTS попыток на один скриншот и EXTRA_READS_PER_SCREENSHOT
+# дополнительных чтений на скриншот в среднем по всему видео
+RETRY_ATTEMPTS = 4
+EXTRA_READS_PER_SCREENSHOT = 2
+
+def sample_indices(total_frames, num_screenshots):
+    """Номера кадров для скриншотов: середины равных частей видео"""
+    return [int((i + 0.5) * total_frames / num_screenshots) for i in range(num_screenshots)]
+
+class FrameReader:
+    """Читает кадры по номерам с ограниченным по стоимости восстановлением после ошибок
+
+    Если кадр не читается, пробуются соседние кадры (не дальше половины шага между
+    скриншотами). Если реально декодируемая часть видео короче заявленной
+    (CAP_PROP_FRAME_COUNT часто завышен), точки, попавшие за ее конец,
+    равномерно распределяются между последним прочитанным и последним читаемым кадром.
+    """
+
+    def __init__(self, cap, total_frames, num_screenshots, stage=None, check=None):
+        self.cap = cap
+        self.total_frames = total_frames
+        self.num_screenshots = num_screenshots
+        self.last_frame = max(0, total_frames - 1)  # уточняется при первой ошибке
+        self.end_checked = False
+        self.last_used = None  # номер последнего прочитанного кадра
+        self.spread = {}  # номер за концом видео -> номер внутри читаемой части
+        spacing = total_frames / max(1, num_screenshots)
+        self.max_offset = max(1, int(spacing / 2))
+        self.extra_reads_left = EXTRA_READS_PER_SCREENSHOT * num_screenshots
+        # stage(name) — контекстный менеджер для замера этапов, check() — проверка остановки
+        self.stage = stage or (lambda name: contextlib.nullcontext())
+        self.check = check or (lambda: None)
+
+    def _read_at(self, frame_index):
+        self.check()
+        with self.stage("seek"):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self.check()
+        with self.stage("decode"):
+            ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _find_last_frame(self):
+        """Ищет последний читаемый кадр: отступает от конца с удваивающимся шагом,
+        затем уточняет границу бинарным поиском с точностью до шага повторных попыток"""
+        self.end_checked = True
+        good = None
+        bad = None
+        frame_index = self.last_frame
+        step = 1
+        while self.extra_reads_left > 0:
+            self.extra_reads_left -= 1
+            if self._read_at(frame_index) is not None:
+                good = frame_index
+                break
+            bad = frame_index
+            if frame_index == 0:
+                break
+            frame_index = max(0, frame_index - step)
+            step *= 2
+        if good is None:
+            # Ни один проверенный кадр не прочитан — конец видео остается прежним
+            return
+        precision = max(1, self.max_offset // RETRY_ATTEMPTS)
+        while bad is not None and bad - good > precision and self.extra_reads_left > 0:
+            self.extra_reads_left -= 1
+            middle = (good + bad) // 2
+            if self._read_at(middle) is not None:
+                good = middle
+            else:
+                bad = middle
+        self.last_frame = good
+        # Оставшиеся точки за концом распределяются по читаемой части, а не повторяют один кадр
+        overflow = [i for i in sample_indices(self.total_frames, self.num_screenshots) if i > good]
+        start = self.last_used if self.last_used is not None and self.last_used < good else 0
+        for j, index in enumerate(overflow):
+            self.spread[index] = int(start + (j + 0.5) * (good - start) / len(overflow))
+
+    def _target(self, frame_index):
+        if frame_index <= self.last_frame:
+            return frame_index
+        return self.spread.get(frame_index, self.last_frame)
+
+    def read(self, frame_index):
+        """Возвращает (номер прочитанного кадра, кадр BGR) или (None, None)"""
+        target = self._target(frame_index)
+        frame = self._read_at(target)
+        if frame is not None:
+            self.last_used = target
+            return target, frame
+        tried = {target}
+        if not self.end_checked:
+            self._find_last_frame()
+        # Кандидаты: номер внутри читаемой части (если точка оказалась за концом), затем соседи
+        candidates = []
+        if self._target(frame_index) != target:
+            target = self._target(frame_index)
+            candidates.append(target)
+        delta = max(1, self.max_offset // RETRY_ATTEMPTS)
+        for k in range(1, RETRY_ATTEMPTS + 1):
+            candidates.extend((target - k * delta, target + k * delta))
+        attempts = 0
+        for candidate in candidates:
+            candidate = min(max(candidate, 0), self.last_frame)
+            if candidate in tried:
+                continue
+            if attempts >= RETRY_ATTEMPTS or self.extra_reads_left <= 0:
+                break
+            tried.add(candidate)
+            attempts += 1
+            self.extra_reads_left -= 1
+            frame = self._read_at(candidate)
+            if frame is not None:
+                self.last_used = candidate
+                return candidate, frame
+        return None, None
+
+def fill_missing(screenshots, substitutions):
+    """Заменяет непрочитанные скриншоты (None) ближайшими прочитанными"""
+    available = [i for i, frame in enumerate(screenshots) if frame is not None]
+    if not available:
+        return []
+    for i, frame in enumerate(screenshots):
+        if frame is None:
+            nearest = min(available, key=lambda j: abs(j - i))
+            screenshots[i] = screenshots[nearest]
+            substitutions.append({"tile": i, "requested": None, "used": f"копия {nearest + 1}"})
+    substitutions.sort(key=lambda item: item["tile"])
+    return screenshots
+
+def extract_screenshots(video_path, num_screenshots=9, substitutions=None):
+    """Извлекает указанное количество скриншотов из видео
+
+    Нечитаемые кадры заменяются соседними; если передан список substitutions,
+    в него добавляются сведения о замененных плитках.
+    """
+    if substitutions is None:
+        substitutions = []
+    cap = cv2.VideoCapture(video_path)
+    
+    if not cap.isOpened():
+        print(f"Ошибка: Не удалось открыть видео {video_path}")
+        return []
+    
+    # Получаем информацию о видео
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    
+    # Вычисляем кадры для извлечения скриншотов
+    frame_indices = sample_indices(total_frames, num_screenshots)
+    
+    screenshots = []
+    reader = FrameReader(cap, total_frames, num_screenshots)
+    
+    for i, frame_index in enumerate(frame_indices):
+        used_index, frame = reader.read(frame_index)
+        
+        if frame is not None:
+            if used_index != frame_index:
+                substitutions.append({"tile": i, "requested": frame_index, "used": used_index})
+            # Конвертируем BGR в RGB
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            screenshots.append(frame_rgb)
+        else:
+            print(f"Ошибка при чтении кадра {frame_index}")
+            screenshots.append(None)
+    
+    cap.release()
+    return fill_missing(screenshots, substitutions)
+
+def format_substitutions(substitutions):
+    """Описание замененных плиток для лога"""
+    return ", ".join(f"{item['tile'] + 1}: кадр {item['requested']} → {item['used']}"
+                     if item["requested"] is not None else f"{item['tile'] + 1}: {item['used']}"
+                     for item in substitutions)
+
+def create_collage(screenshots, output_path):
+    """Создает коллаж из скриншотов 3x3"""
+    if len(screenshots) != 9:
+        print(f"Ошибка: ожидается 9 скриншотов, получено {len(screenshots)}")
+        return False
+    
+    # Определяем размеры для каждого скриншота
+    # Используем размер первого скриншота как базовый
+    base_height, base_width = screenshots[0].shape[:2]
+    
+    # Вычисляем размер для каждого скриншота в коллаже
+    # Делаем их квадратными для равномерности
+    target_size = min(base_width, base_height)
+    
+    # Создаем пустой коллаж
+    collage_width = target_size * 3
+    collage_height = target_size * 3
+    collage = np.zeros((collage_height, collage_width, 3), dtype=np.uint8)
+    
+    # Размещаем скриншоты в коллаже
+    for i, screenshot in enumerate(screenshots):
+        row = i // 3
+        col = i % 3
+        
+        # Изменяем размер скриншота
+        resized = cv2.resize(screenshot, (target_size, target_size))
+        
+        # Вычисляем позицию в коллаже
+        y_start = row * target_size
+        y_end = (row + 1) * target_size
+        x_start = col * target_size
+        x_end = (col + 1) * target_size
+        
+        # Вставляем скриншот в коллаж
+        collage[y_start:y_end, x_start:x_end] = resized
+    
+    # Сохраняем коллаж
+    collage_pil = Image.fromarray(collage)
+    collage_pil.save(output_path, 'JPEG', quality=95)
+    
+    return True
+
+def create_aspect_collage(screenshots, output, aspect="16:9"):
+    """Создает коллаж из произвольного числа скриншотов на холсте 16:9 или 9:16
+
+    output может быть путем к файлу или файловым объектом (например, io.BytesIO).
+    """
+    if not screenshots:
+        return False
+    num_images = len(screenshots)
+    # Вычисляем наиболее квадратную сетку
+    cols = math.ceil(math.sqrt(num_images))
+    rows = math.ceil(num_images / cols)
+    # Для 16:9 приводим кадры к одной высоте, для 9:16 — к одной ширине
+    if aspect == '16:9':
+        target_h = min(frame.shape[0] for frame in screenshots)
+        resized = [cv2.resize(frame, (int(frame.shape[1] * target_h / frame.shape[0]), target_h)) for frame in screenshots]
+    else:
+        target_w = min(frame.shape[1] for frame in screenshots)
+        resized = [cv2.resize(frame, (target_w, int(frame.shape[0] * target_w / frame.shape[1]))) for frame in screenshots]
+    # Собираем сетку
+    grid = []
+    for r in range(rows):
+        row_imgs = resized[r*cols:(r+1)*cols]
+        if not row_imgs:
+            continue
+        if aspect == '16:9':
+            h = min(img.shape[0] for img in row_imgs)
+            row_imgs = [cv2.resize(img, (int(img.shape[1] * h / img.shape[0]), h)) for img in row_imgs]
+            grid.append(np.hstack(row_imgs))
+        else:
+            w = min(img.shape[1] for img in row_imgs)
+            row_imgs = [cv2.resize(img, (w, int(img.shape[0] * w / img.shape[1]))) for img in row_imgs]
+            grid.append(np.vstack(row_imgs))
+    collage = np.vstack(grid) if aspect == '16:9' else np.hstack(grid)
+    # Вписываем в холст с нужным соотношением сторон
+    if aspect == '16:9':
+        target_w, target_h = 1920, 1080
+    else:
+        target_w, target_h = 1080, 1920
+    collage_pil = Image.fromarray(collage)
+    collage_pil.thumbnail((target_w, target_h), resample_filter())
+    result = Image.new('RGB', (target_w, target_h), (0, 0, 0))
+    x = (target_w - collage_pil.width) // 2
+    y = (target_h - collage_pil.height) // 2
+    result.paste(collage_pil, (x, y))
+    result.save(output, 'JPEG', quality=95)
+    return True
@@ -0,0 +1,238 @@
+"""
+Дисковый кэш извлеченных кадров
+
+Кадры хранятся уменьшенными в виде .npy файлов и читаются через memory-map,
+поэтому повторная сборка коллажа (другой формат, другое число картинок)
+не требует повторного декодирования видео.
+
+Структура папки кэша:
+    <cache_dir>/<ключ видео>/meta.json      — число кадров и FPS
+    <cache_dir>/<ключ видео>/<номер>.npy    — кадр RGB
+"""
+
+import os
+import json
+import bisect
+import hashlib
+import shutil
+import threading
+from collections import OrderedDict
+
+from colager.core import sample_indices
+from colager.lazy import cv2, np
+
+
+class FrameCache:
+    """Кэш кадров с вытеснением по размеру (LRU)"""
+
+    def __init__(self, cache_dir=".frame_cache", max_bytes=2 * 1024 * 1024 * 1024,
+                 max_side=960, tolerance_ratio=0.005):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Кадры уменьшаются до max_side по длинной стороне: этого достаточно
+        # для плитки в коллаже 1920x1080 при 4 и более картинках
+        self.max_side = max_side
+        # Допустимое отклонение найденного кадра от запрошенного (доля от длины видео),
+        # если не известно количество скриншотов
+        self.tolerance_ratio = tolerance_ratio
+        self.lock = threading.Lock()
+        self.files = OrderedDict()  # путь к .npy -> размер, от старых к новым
+        self.total_bytes = 0
+        self.index = {}  # ключ видео -> отсортированный список номеров кадров
+        # Папка кэша сканируется при первом обращении к кадрам, а не при создании,
+        # чтобы не задерживать запуск GUI на больших кэшах
+        self.index_loaded = False
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _ensure_index(self):
+        if self.index_loaded:
+            return
+        with self.lock:
+            if not self.index_loaded:
+                self._load_index()
+                self.index_loaded = True
+
+    def _load_index(self):
+        """Сканирует папку кэша и восстанавливает порядок LRU по времени доступа
+
+        Временные файлы прерванных записей удаляются, как и папки видео без
+        закэшированных кадров (в них остался только meta.json).
+        """
+        entries = []
+        for video_key in os.listdir(self.cache_dir):
+            video_dir = os.path.join(self.cache_dir, video_key)
+            if not os.path.isdir(video_dir):
+                continue
+            has_frames = False
+            for name in os.listdir(video_dir):
+                if not name.endswith(".npy"):
+                    continue
+                path = os.path.join(video_dir, name)
+                if name.endswith(".tmp.npy"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    stat = os.stat(path)
+                    frame_index = int(name[:-4])
+                except (OSError, ValueError):
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size, video_key, frame_index))
+                has_frames = True
+            if not has_frames:
+                shutil.rmtree(video_dir, ignore_errors=True)
+        for _, path, size, video_key, frame_index in sorted(entries):
+            self.files[path] = size
+            self.total_bytes += size
+            bisect.insort(self.index.setdefault(video_key, []), frame_index)
+        self._evict()
+
+    @staticmethod
+    def video_key(video_path):
+        """Ключ видео: путь, размер и время изменения файла"""
+        stat = os.stat(video_path)
+        identity = f"{os.path.realpath(video_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def _frame_path(self, video_key, frame_index):
+        return os.path.join(self.cache_dir, video_key, f"{frame_index}.npy")
+
+    def get_meta(self, video_key):
+        """Возвращает (total_frames, fps) или None"""
+        try:
+            with open(os.path.join(self.cache_dir, video_key, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            return meta["total_frames"], meta["fps"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put_meta(self, video_key, total_frames, fps):
+        self._ensure_index()
+        video_dir = os.path.join(self.cache_dir, video_key)
+        os.makedirs(video_dir, exist_ok=True)
+        with open(os.path.join(video_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"total_frames": total_frames, "fps": fps}, f)
+
+    def get(self, video_key, frame_index, total_frames=None, num_screenshots=None):
+        """Возвращает ближайший закэшированный кадр (memory-map) или None
+
+        Если задано num_screenshots, подходит любой кадр из участка видео, который
+        представляет плитка (видео делится на num_screenshots равных участков).
+        Так кадры, извлеченные для другого количества картинок, используются повторно,
+        а соседние плитки не получают один и тот же кадр.
+        """
+        self._ensure_index()
+        with self.lock:
+            nearest = self._lookup(video_key, frame_index, total_frames, num_screenshots)
+            if nearest is None:
+                return None
+            path = self._frame_path(video_key, nearest)
+            if path in self.files:
+                self.files.move_to_end(path)
+        try:
+            frame = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            self._forget(video_key, nearest, path)
+            return None
+        return frame
+
+    def _lookup(self, video_key, frame_index, total_frames, num_screenshots):
+        """Номер подходящего закэшированного кадра или None (вызывается под self.lock)"""
+        if total_frames and num_screenshots:
+            tile = frame_index * num_screenshots // total_frames
+
+            def matches(idx):
+                return idx * num_screenshots // total_frames == tile
+        else:
+            tolerance = int(total_frames * self.tolerance_ratio) if total_frames else 0
+
+            def matches(idx):
+                return abs(idx - frame_index) <= tolerance
+        cached = self.index.get(video_key)
+        if not cached:
+            return None
+        pos = bisect.bisect_left(cached, frame_index)
+        # Ближайшие кадры слева и справа; более далекие не ближе к запрошенному
+        candidates = [idx for idx in cached[max(0, pos - 1):pos + 1] if matches(idx)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda idx: abs(idx - frame_index))
+
+    def covers(self, video_path, num_screenshots):
+        """True, если кадры для всех плиток видео уже в кэше и видео не придется читать"""
+        try:
+            video_key = self.video_key(video_path)
+        except OSError:
+            return False
+        meta = self.get_meta(video_key)
+        if meta is None:
+            return False
+        total_frames = meta[0]
+        self._ensure_index()
+        with self.lock:
+            return all(self._lookup(video_key, frame_index, total_frames, num_screenshots) is not None
+                       for frame_index in sample_indices(total_frames, num_screenshots))
+
+    def put(self, video_key, frame_index, frame):
+        """Уменьшает кадр (если он еще не уменьшен), сохраняет его в кэш и возвращает уменьшенную версию"""
+        self._ensure_index()
+        frame = self.downscale(frame)
+        video_dir = os.path.join(self.cache_dir, video_key)
+        os.makedirs(video_dir, exist_ok=True)
+        path = self._frame_path(video_key, frame_index)
+        tmp_path = path[:-4] + ".tmp.npy"
+        try:
+            np.save(tmp_path, frame)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError:
+            # Недописанный временный файл не должен занимать место вне учета кэша
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return frame
+        with self.lock:
+            self.total_bytes -= self.files.pop(path, 0)
+            self.files[path] = size
+            self.total_bytes += size
+            cached = self.index.setdefault(video_key, [])
+            if frame_index not in cached:
+                bisect.insort(cached, frame_index)
+            self._evict()
+        return frame
+
+    def downscale(self, frame):
+        height, width = frame.shape[:2]
+        scale = self.max_side / max(height, width)
+        if scale >= 1:
+            return frame
+        return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    def _forget(self, video_key, frame_index, path):
+        with self.lock:
+            self.total_bytes -= self.files.pop(path, 0)
+            cached = self.index.get(video_key, [])
+            if frame_index in cached:
+                cached.remove(frame_index)
+
+    def _evict(self):
+        """Удаляет самые давно использованные кадры, пока кэш больше лимита"""
+        while self.total_bytes > self.max_bytes and self.files:
+            path, size = self.files.popitem(last=False)
+            self.total_bytes -= size
+            video_key = os.path.basename(os.path.dirname(path))
+            frame_index = int(os.path.basename(path)[:-4])
+            cached = self.index.get(video_key, [])
+            if frame_index in cached:
+                cached.remove(frame_index)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            if not cached:
+                self.index.pop(video_key, None)
+                shutil.rmtree(os.path.dirname(path), ignore_errors=True)
@@ -0,0 +1,233 @@
+"""
+Планирование порядка обработки видео по оценке стоимости
+
+Стоимость задачи оценивается по параметрам видео (длительность, разрешение, кодек,
+размер файла) линейной моделью, коэффициенты которой уточняются по времени прошлых запусков.
+Видео, которые еще не открывались, оцениваются только по размеру файла, чтобы
+планирование не требовало открывать каждый файл до начала обработки.
+
+Политики:
+    fifo     — в исходном порядке: как в папке (консольные версии) или как в списке GUI
+    shortest — сначала дешевые задачи: быстрее появляются первые коллажи
+    longest  — сначала дорогие: при обработке в пуле процессов это LPT (меньше общее
+               время), при последовательной обработке выигрыша нет
+"""
+
+import os
+import json
+
+from colager.lazy import cv2, np
+
+POLICIES = ("fifo", "shortest", "longest")
+# Политики, которые имеют смысл при обработке видео по одному
+SEQUENTIAL_POLICIES = ("fifo", "shortest")
+POLICY_NAMES = {
+    "fifo": "Как в списке",
+    "shortest": "Сначала короткие",
+    "longest": "Сначала длинные",
+}
+
+# Относительная сложность декодирования кадра по сравнению с H.264
+CODEC_FACTORS = {
+    "h264": 1.0, "avc1": 1.0, "x264": 1.0,
+    "hevc": 1.8, "hvc1": 1.8, "hev1": 1.8, "h265": 1.8,
+    "av01": 2.5, "vp09": 1.6, "vp90": 1.6, "vp80": 1.2,
+    "mjpg": 0.5, "mp4v": 0.8, "xvid": 0.8, "divx": 0.8,
+    "wmv3": 1.0, "flv1": 0.7,
+}
+
+HISTORY_LIMIT = 500
+
+# Для непроверенных видео длительность оценивается по размеру (~8 Мбит/с)
+ASSUMED_MB_PER_MINUTE = 60.0
+
+
+class VideoJob:
+    """Параметры видео, нужные для оценки стоимости обработки"""
+
+    def __init__(self, path, frame_count=0, fps=0.0, width=0, height=0, codec="", size=0):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.frame_count = frame_count
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.codec = codec
+        self.size = size
+        self.priority = 1  # 0 — приоритетная папка
+        self.cost = 0.0
+        self.probed = False  # True — параметры считаны из видео, а не только из файловой системы
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+
+def stat_job(video_path):
+    """Задача по данным файловой системы, без открытия видео"""
+    try:
+        size = os.path.getsize(video_path)
+    except OSError:
+        size = 0
+    return VideoJob(video_path, size=size)
+
+def probe_video(video_path):
+    """Считывает метаданные видео без декодирования кадров"""
+    try:
+        size = os.path.getsize(video_path)
+    except OSError:
+        size = 0
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            job = VideoJob(video_path, size=size)
+            job.probed = True
+            return job
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\0 ").lower()
+        job = VideoJob(
+            video_path,
+            frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            fps=cap.get(cv2.CAP_PROP_FPS),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            codec=codec,
+            size=size,
+        )
+        job.probed = True
+        return job
+    finally:
+        cap.release()
+
+
+class CostModel:
+    """Линейная модель:
+    время = c0 + c1 * (кадры * мегапиксели * сложность кодека) + c2 * МБ + c3 * минуты
+
+    Длительность учитывает более дорогой поиск в длинных файлах (больше индекс,
+    дальше ключевые кадры), размер файла — объем чтения с диска.
+    """
+
+    DEFAULT_COEFFICIENTS = [0.2, 0.01, 0.002, 0.005]
+
+    def __init__(self, history_path=".scheduler_history.json", min_observations=5):
+        self.history_path = history_path
+        self.min_observations = min_observations
+        self.coefficients = list(self.DEFAULT_COEFFICIENTS)
+        self.observations = []  # [признаки, секунды]
+        self.fitted = False  # модель обучается при первой оценке, чтобы не загружать NumPy при старте
+        self.load()
+
+    @staticmethod
+    def features(job, num_samples):
+        megapixels = job.width * job.height / 1e6 if job.width and job.height else 2.0
+        codec_factor = CODEC_FACTORS.get(job.codec, 1.0)
+        size_mb = job.size / (1024 * 1024)
+        minutes = job.duration / 60 if job.duration > 0 else size_mb / ASSUMED_MB_PER_MINUTE
+        return [1.0, num_samples * megapixels * codec_factor, size_mb, minutes]
+
+    def estimate(self, job, num_samples=9):
+        if not self.fitted:
+            self.fit()
+        return sum(c * f for c, f in zip(self.coefficients, self.features(job, num_samples)))
+
+    def record(self, job, num_samples, seconds):
+        """Запоминает фактическое время обработки и переобучает модель (только для проверенных видео)"""
+        if not job.probed:
+            return
+        self.observations.append([self.features(job, num_samples), seconds])
+        del self.observations[:-HISTORY_LIMIT]
+        self.fit()
+
+    def fit(self):
+        self.fitted = True
+        if len(self.observations) < self.min_observations:
+            return
+        x = np.array([features for features, _ in self.observations])
+        y = np.array([seconds for _, seconds in self.observations])
+        # Неотрицательный МНК: отрицательные коэффициенты физически бессмысленны, поэтому
+        # такие признаки исключаются, а модель заново подбирается по оставшимся
+        active = list(range(x.shape[1]))
+        while active:
+            solution, *_ = np.linalg.lstsq(x[:, active], y, rcond=None)
+            if (solution >= 0).all():
+                break
+            active = [i for i, c in zip(active, solution) if c >= 0]
+        if not active:
+            self.coefficients = list(self.DEFAULT_COEFFICIENTS)
+            return
+        coefficients = [0.0] * x.shape[1]
+        for i, c in zip(active, solution):
+            coefficients[i] = float(c)
+        self.coefficients = coefficients
+
+    def load(self):
+        if not self.history_path or not os.path.exists(self.history_path):
+            return
+        try:
+            with open(self.history_path, encoding="utf-8") as f:
+                observations = json.load(f)[-HISTORY_LIMIT:]
+            # Наблюдения со старым набором признаков пропускаются
+            size = len(self.DEFAULT_COEFFICIENTS)
+            self.observations = [item for item in observations if len(item[0]) == size]
+        except (OSError, ValueError, TypeError, IndexError):
+            self.observations = []
+        self.fitted = False
+
+    def save(self):
+        if not self.history_path:
+            return
+        try:
+            with open(self.history_path, "w", encoding="utf-8") as f:
+                json.dump(self.observations, f)
+        except OSError:
+            pass
+
+
+class JobScheduler:
+    def __init__(self, cost_model=None, priority_folders=()):
+        self.cost_model = cost_model if cost_model is not None else CostModel()
+        self.priority_folders = [os.path.realpath(folder) for folder in priority_folders]
+
+    def make_jobs(self, video_paths, num_samples=9, known=None, check=None):
+        """Оценивает стоимость каждой задачи без открытия видео
+
+        known — {путь: VideoJob} с уже считанными параметрами (например, из фонового
+        определения длительности в GUI); остальные видео оцениваются по размеру файла.
+        check() вызывается перед каждым файлом и может прервать планирование.
+        """
+        known = known or {}
+        jobs = []
+        for path in video_paths:
+            if check is not None:
+                check()
+            job = known.get(path) or stat_job(path)
+            job.cost = self.cost_model.estimate(job, num_samples)
+            real_path = os.path.realpath(path)
+            if any(os.path.commonpath([real_path, folder]) == folder for folder in self.priority_folders):
+                job.priority = 0
+            jobs.append(job)
+        return jobs
+
+    def order(self, jobs, policy="shortest"):
+        """Возвращает задачи в порядке обработки; приоритетные папки всегда идут первыми"""
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика: {policy}")
+        if policy == "fifo":
+            return sorted(jobs, key=lambda job: job.priority)
+        if policy == "shortest":
+            return sorted(jobs, key=lambda job: (job.priority, job.cost))
+        return sorted(jobs, key=lambda job: (job.priority, -job.cost))
+
+    def probe(self, job):
+        """Считывает параметры видео для задачи, созданной по размеру файла"""
+        if job.probed:
+            return job
+        probed = probe_video(job.path)
+        probed.priority = job.priority
+        probed.cost = job.cost
+        return probed
+
+    def record(self, job, num_samples, seconds):
+        """Запоминает время обработки; непроверенное видео сначала открывается для уточнения параметров"""
+        self.cost_model.record(self.probe(job), num_samples, seconds)
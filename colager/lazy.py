@@ -0,0 +1,51 @@
+"""
+Ленивая загрузка тяжелых зависимостей
+
+Модуль импортируется при первом обращении к атрибуту. Если зависимость не
+установлена, выводится подсказка по установке и программа завершается, как и
+раньше при импорте на уровне модуля.
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Заместитель модуля, который импортирует настоящий модуль при первом обращении"""
+
+    def __init__(self, name, install_hint):
+        super().__init__(name)
+        self._install_hint = install_hint
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self.__name__)
+            except ImportError:
+                print(f"Ошибка: Не удалось импортировать {self.__name__}. Установите: {self._install_hint}")
+                sys.exit(1)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def missing_dependencies():
+    """Загружает все тяжелые зависимости; возвращает список подсказок для отсутствующих"""
+    missing = []
+    for module in (cv2, np, Image):
+        try:
+            importlib.import_module(module.__name__)
+        except ImportError:
+            missing.append(f"{module.__name__}: {module._install_hint}")
+    return missing
+
+
+cv2 = LazyModule("cv2", "pip install opencv-python")
+np = LazyModule("numpy", "pip install numpy")
+Image = LazyModule("PIL.Image", "pip install Pillow")
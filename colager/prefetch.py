@@ -0,0 +1,118 @@
+"""
+Упреждающее чтение следующего видео
+
+Пока декодируется видео N, фоновый поток прогревает кэш ОС для видео N+1:
+начало файла (заголовок контейнера), конец файла (индекс moov/cues/idx1)
+и участки вокруг позиций, с которых будут браться скриншоты.
+Это скрывает задержки медленного (сетевого) хранилища за работой декодера.
+"""
+
+import os
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Prefetcher:
+    """Фоновый прогрев видео в пределах бюджета ввода-вывода на один файл"""
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024, header_bytes=2 * 1024 * 1024,
+                 tail_bytes=2 * 1024 * 1024, mode="auto"):
+        self.budget_bytes = budget_bytes
+        self.header_bytes = header_bytes
+        self.tail_bytes = tail_bytes
+        # auto — posix_fadvise(WILLNEED), если доступен, иначе чтение в фоне; read — всегда чтение
+        self.mode = mode
+        self.use_fadvise = mode == "auto" and hasattr(os, "posix_fadvise")
+        self.condition = threading.Condition()
+        self.pending = None  # (путь, количество скриншотов)
+        self.cancelled = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def plan(self, video_path, num_samples=9):
+        """Возвращает список диапазонов (смещение, длина), которые нужно прогреть"""
+        try:
+            size = os.path.getsize(video_path)
+        except OSError:
+            return []
+        if size <= self.budget_bytes:
+            return [(0, size)]
+        header = min(self.header_bytes, self.budget_bytes // 4)
+        tail = min(self.tail_bytes, self.budget_bytes // 4)
+        ranges = [(0, header), (size - tail, tail)]
+        window = (self.budget_bytes - header - tail) // max(1, num_samples)
+        for i in range(num_samples):
+            # Смещение в байтах примерно пропорционально времени; окно сдвинуто назад,
+            # потому что декодер начинает с ближайшего предшествующего ключевого кадра
+            position = int((i + 0.5) * size / num_samples)
+            start = max(0, position - window * 3 // 4)
+            ranges.append((start, min(window, size - start)))
+        return self._merge(ranges)
+
+    @staticmethod
+    def _merge(ranges):
+        merged = []
+        for start, length in sorted(ranges):
+            if merged and start <= merged[-1][0] + merged[-1][1]:
+                last_start, last_length = merged[-1]
+                merged[-1] = (last_start, max(last_length, start + length - last_start))
+            else:
+                merged.append((start, length))
+        return merged
+
+    def prefetch(self, video_path, num_samples=9):
+        """Ставит видео в очередь на прогрев (предыдущий незавершенный прогрев отменяется)"""
+        if self.budget_bytes <= 0:
+            return
+        with self.condition:
+            self.pending = (video_path, num_samples)
+            self.cancelled = True
+            self.condition.notify()
+
+    def cancel(self):
+        """Отменяет ожидающий и текущий прогрев (например, при остановке обработки)"""
+        with self.condition:
+            self.pending = None
+            self.cancelled = True
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.cancelled = True
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                video_path, num_samples = self.pending
+                self.pending = None
+                self.cancelled = False
+            try:
+                self._warm(video_path, self.plan(video_path, num_samples))
+            except OSError:
+                pass
+
+    def _warm(self, video_path, ranges):
+        with open(video_path, "rb", buffering=0) as f:
+            if self.use_fadvise:
+                for start, length in ranges:
+                    os.posix_fadvise(f.fileno(), start, length, os.POSIX_FADV_WILLNEED)
+                return
+            buffer = bytearray(CHUNK_SIZE)
+            for start, length in ranges:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    if self.cancelled:
+                        return
+                    view = memoryview(buffer)[:min(CHUNK_SIZE, remaining)]
+                    read = f.readinto(view)
+                    if not read:
+                        break
+                    remaining -= read
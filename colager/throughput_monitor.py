@@ -0,0 +1,151 @@
+"""
+Сбор метрик производительности обработки видео
+
+Считает кадры в секунду, скорость чтения с диска, распределение времени по этапам
+(поиск, декодирование, масштабирование, кодирование) и оценивает оставшееся время
+с учетом длительности видео, а не количества файлов.
+"""
+
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+STAGES = ("seek", "decode", "resize", "encode")
+STAGE_NAMES = {
+    "seek": "поиск",
+    "decode": "декодирование",
+    "resize": "масштабирование",
+    "encode": "кодирование",
+}
+
+
+def read_process_bytes():
+    """Возвращает количество байт, прочитанных процессом (только Linux), или None"""
+    try:
+        with open("/proc/self/io", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ThroughputMonitor:
+    """Потокобезопасные счетчики, которые обновляет поток обработки и читает GUI"""
+
+    def __init__(self, history_size=120):
+        self.lock = threading.Lock()
+        self.history = deque(maxlen=history_size)  # (время, кадров/с, МБ/с)
+        self.reset({})
+
+    def reset(self, durations):
+        """Начинает новый запуск; durations — {имя файла: длительность в секундах}"""
+        known = [d for d in durations.values() if d > 0]
+        # Для файлов с неизвестной длительностью берем среднюю длительность
+        fallback = sum(known) / len(known) if known else 1.0
+        with self.lock:
+            self.weights = {name: (d if d > 0 else fallback) for name, d in durations.items()}
+            self.total_weight = sum(self.weights.values())
+            self.done_weight = 0.0
+            self.current_weight = 0.0
+            self.current_samples = 0
+            self.current_done = 0
+            self.frames = 0
+            self.stage_time = dict.fromkeys(STAGES, 0.0)
+            self.started = time.perf_counter()
+            self.paused_at = None  # момент начала текущей паузы
+            self.paused_total = 0.0  # суммарная длительность завершенных пауз
+            self.file_bytes = 0
+            self.start_bytes = read_process_bytes()
+            self.last_sample = (self.started, 0, self._bytes_read())
+            self.history.clear()
+
+    def pause(self):
+        """Останавливает часы запуска: время паузы не входит в прошедшее время и оценку ETA"""
+        with self.lock:
+            if self.paused_at is None:
+                self.paused_at = time.perf_counter()
+
+    def resume(self):
+        with self.lock:
+            if self.paused_at is not None:
+                self.paused_total += time.perf_counter() - self.paused_at
+                self.paused_at = None
+
+    def _active_time(self, now):
+        paused = self.paused_total
+        if self.paused_at is not None:
+            paused += now - self.paused_at
+        return now - self.started - paused
+
+    def active_time(self):
+        """Время с начала запуска без учета пауз"""
+        now = time.perf_counter()
+        with self.lock:
+            return self._active_time(now)
+
+    def _bytes_read(self):
+        if self.start_bytes is None:
+            return self.file_bytes
+        current = read_process_bytes()
+        return current - self.start_bytes if current is not None else self.file_bytes
+
+    def begin_video(self, name, num_samples):
+        with self.lock:
+            self.current_weight = self.weights.get(name, 0.0)
+            self.current_samples = max(1, num_samples)
+            self.current_done = 0
+
+    def frame_done(self, decoded=True):
+        with self.lock:
+            self.current_done = min(self.current_done + 1, self.current_samples)
+            if decoded:
+                self.frames += 1
+
+    def end_video(self, file_size=0):
+        with self.lock:
+            self.done_weight += self.current_weight
+            self.current_weight = 0.0
+            self.current_done = 0
+            self.file_bytes += file_size
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.stage_time[name] += elapsed
+
+    def snapshot(self):
+        """Снимает текущие показатели и добавляет точку в историю"""
+        now = time.perf_counter()
+        bytes_read = self._bytes_read()
+        with self.lock:
+            last_time, last_frames, last_bytes = self.last_sample
+            interval = max(now - last_time, 1e-6)
+            fps = (self.frames - last_frames) / interval
+            mb_per_s = (bytes_read - last_bytes) / interval / (1024 * 1024)
+            self.last_sample = (now, self.frames, bytes_read)
+
+            done = self.done_weight + self.current_weight * self.current_done / max(1, self.current_samples)
+            fraction = done / self.total_weight if self.total_weight else 0.0
+            elapsed = self._active_time(now)
+            eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+
+            stage_total = sum(self.stage_time.values())
+            split = {name: (t / stage_total if stage_total else 0.0) for name, t in self.stage_time.items()}
+            self.history.append((elapsed, fps, mb_per_s))
+            return {
+                "fps": fps,
+                "mb_per_s": mb_per_s,
+                "fraction": min(fraction, 1.0),
+                "elapsed": elapsed,
+                "eta": eta,
+                "stage_split": split,
+                "frames": self.frames,
+            }
@@ -0,0 +1,100 @@
+"""
+Модель списка видео для GUI
+
+Хранит все найденные файлы в памяти, а сортировка и фильтрация работают над
+списком индексов, поэтому GUI может показывать только видимые строки даже
+для папок с десятками тысяч файлов.
+"""
+
+import os
+
+from colager.core import VIDEO_EXTENSIONS, format_size
+
+SORT_KEYS = ("name", "size", "duration")
+
+
+class VideoEntry:
+    __slots__ = ("name", "path", "size", "duration", "job")
+
+    def __init__(self, name, path, size):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.duration = None  # None — еще не определена, 0 — ошибка чтения
+        self.job = None  # VideoJob с параметрами видео после фонового определения
+
+
+class VideoListModel:
+    def __init__(self):
+        self.entries = []
+        self.view = []  # индексы entries после фильтрации и сортировки
+        self.filter_text = ""
+        self.sort_key = None  # None — порядок как в папке
+        self.sort_reverse = False
+
+    def __len__(self):
+        return len(self.view)
+
+    def scan(self, folder):
+        """Сканирует папку; размеры берутся из os.scandir без отдельного вызова stat на файл"""
+        entries = []
+        with os.scandir(folder) as it:
+            for item in it:
+                name = item.name
+                if not any(name.lower().endswith(ext) for ext in VIDEO_EXTENSIONS):
+                    continue
+                try:
+                    size = item.stat().st_size
+                except OSError:
+                    size = 0
+                entries.append(VideoEntry(name, item.path, size))
+        self.entries = entries
+        self.refresh_view()
+
+    def set_filter(self, text):
+        self.filter_text = text.strip().lower()
+        self.refresh_view()
+
+    def sort_by(self, key, reverse=None):
+        """Сортирует по name/size/duration; повторный вызов с тем же ключом меняет направление"""
+        if key not in SORT_KEYS:
+            raise ValueError(f"Неизвестный ключ сортировки: {key}")
+        if reverse is None:
+            reverse = not self.sort_reverse if key == self.sort_key else False
+        self.sort_key = key
+        self.sort_reverse = reverse
+        self.refresh_view()
+
+    def refresh_view(self):
+        entries = self.entries
+        if self.filter_text:
+            text = self.filter_text
+            view = [i for i, entry in enumerate(entries) if text in entry.name.lower()]
+        else:
+            view = list(range(len(entries)))
+        if self.sort_key == "name":
+            view.sort(key=lambda i: entries[i].name.lower(), reverse=self.sort_reverse)
+        elif self.sort_key == "size":
+            view.sort(key=lambda i: entries[i].size, reverse=self.sort_reverse)
+        elif self.sort_key == "duration":
+            # Файлы с неизвестной длительностью всегда в конце
+            known = [i for i in view if entries[i].duration is not None]
+            unknown = [i for i in view if entries[i].duration is None]
+            known.sort(key=lambda i: entries[i].duration, reverse=self.sort_reverse)
+            view = known + unknown
+        self.view = view
+
+    def row(self, position):
+        """Значения строки для Treeview; размер и длительность форматируются только для видимых строк"""
+        entry = self.entries[self.view[position]]
+        if entry.duration is None:
+            duration_str = "…"
+        elif entry.duration > 0:
+            duration_str = f"{entry.duration:.1f}s"
+        else:
+            duration_str = "Ошибка"
+        return entry.name, format_size(entry.size), duration_str
+
+    def visible_entries(self):
+        """Записи в текущем порядке с учетом фильтра"""
+        return [self.entries[i] for i in self.view]
@@ -5,7 +5,7 @@
 
 import os
 import sys
-from video_collage_creator import get_video_duration, extract_screenshots, create_collage
+from colager.core import get_video_duration, extract_screenshots, create_collage
 
 def test_video_processing():
     """Тестирует обработку видео файлов"""
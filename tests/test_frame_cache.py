@@ -0,0 +1,130 @@
+"""
+Тесты дискового кэша кадров (FrameCache)
+
+Кэш создается во временной папке; кадры — небольшие массивы NumPy,
+номер кадра записан в первый пиксель.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colager import core
+from colager.frame_cache import FrameCache
+from colager.lazy import np
+
+TOTAL_FRAMES = 900
+
+
+def make_frame(frame_index):
+    frame = np.zeros((8, 8, 3), dtype=np.uint16)
+    frame[0, 0, 0] = frame_index
+    return frame
+
+
+def frame_number(frame):
+    return int(frame[0, 0, 0])
+
+
+class FrameCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def fill(self, cache, num_screenshots):
+        for frame_index in core.sample_indices(TOTAL_FRAMES, num_screenshots):
+            cache.put("video", frame_index, make_frame(frame_index))
+
+    def lookup(self, cache, num_screenshots):
+        """Номера кадров из кэша для каждой плитки (None — промах)"""
+        result = []
+        for frame_index in core.sample_indices(TOTAL_FRAMES, num_screenshots):
+            frame = cache.get("video", frame_index, TOTAL_FRAMES, num_screenshots)
+            result.append(None if frame is None else frame_number(frame))
+        return result
+
+    def test_fewer_tiles_reuse_all_frames(self):
+        cache = FrameCache(self.cache_dir)
+        self.fill(cache, 16)
+        for num_screenshots in (4, 6, 9, 12):
+            found = self.lookup(cache, num_screenshots)
+            self.assertNotIn(None, found)
+            self.assertEqual(len(set(found)), num_screenshots)
+
+    def test_more_tiles_reuse_frame_of_each_segment(self):
+        cache = FrameCache(self.cache_dir)
+        self.fill(cache, 9)
+        found = self.lookup(cache, 16)
+        hits = [index for index in found if index is not None]
+        # Каждый из 9 кадров попадает ровно в один из 16 участков
+        self.assertEqual(sorted(hits), core.sample_indices(TOTAL_FRAMES, 9))
+        for tile, index in enumerate(found):
+            if index is not None:
+                self.assertEqual(index * 16 // TOTAL_FRAMES, tile)
+
+    def test_frame_from_other_segment_is_not_used(self):
+        cache = FrameCache(self.cache_dir)
+        # При 9 плитках первый участок — кадры 0..99
+        cache.put("video", 95, make_frame(95))
+        self.assertEqual(frame_number(cache.get("video", 50, TOTAL_FRAMES, 9)), 95)
+        self.assertIsNone(cache.get("video", 150, TOTAL_FRAMES, 9))
+        self.assertIsNone(cache.get("other", 50, TOTAL_FRAMES, 9))
+
+    def test_covers_video_only_when_every_tile_is_cached(self):
+        video_path = os.path.join(self.cache_dir, "clip.mp4")
+        with open(video_path, "wb") as f:
+            f.write(b"video")
+        cache = FrameCache(self.cache_dir)
+        self.assertFalse(cache.covers(video_path, 9))
+        video_key = cache.video_key(video_path)
+        cache.put_meta(video_key, TOTAL_FRAMES, 25.0)
+        for frame_index in core.sample_indices(TOTAL_FRAMES, 16):
+            cache.put(video_key, frame_index, make_frame(frame_index))
+        self.assertTrue(cache.covers(video_path, 9))
+        self.assertTrue(cache.covers(video_path, 16))
+        cache.put(video_key, 10, make_frame(10))
+        self.assertFalse(cache.covers(os.path.join(self.cache_dir, "missing.mp4"), 9))
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = FrameCache(self.cache_dir)
+        cache.put("video", 0, make_frame(0))
+        frame_size = cache.total_bytes
+        cache.max_bytes = 3 * frame_size
+        cache.put("video", 100, make_frame(100))
+        cache.put("video", 200, make_frame(200))
+        # Обращение к кадру 0 делает самым старым кадр 100
+        self.assertIsNotNone(cache.get("video", 0))
+        cache.put("video", 300, make_frame(300))
+        self.assertEqual(cache.index["video"], [0, 200, 300])
+        self.assertEqual(cache.total_bytes, 3 * frame_size)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "video", "100.npy")))
+
+    def test_index_rebuilt_from_disk(self):
+        cache = FrameCache(self.cache_dir)
+        self.fill(cache, 9)
+        cache.put_meta("video", TOTAL_FRAMES, 25.0)
+        total_bytes = cache.total_bytes
+        # Остатки прерванной записи и папка без кадров
+        open(os.path.join(self.cache_dir, "video", "7.tmp.npy"), "wb").close()
+        os.makedirs(os.path.join(self.cache_dir, "empty"))
+        with open(os.path.join(self.cache_dir, "empty", "meta.json"), "w", encoding="utf-8") as f:
+            f.write("{}")
+
+        reopened = FrameCache(self.cache_dir)
+        self.assertFalse(reopened.index_loaded)
+        self.assertEqual(self.lookup(reopened, 9), core.sample_indices(TOTAL_FRAMES, 9))
+        self.assertEqual(reopened.index["video"], core.sample_indices(TOTAL_FRAMES, 9))
+        self.assertEqual(reopened.total_bytes, total_bytes)
+        self.assertEqual(reopened.get_meta("video"), (TOTAL_FRAMES, 25.0))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "video", "7.tmp.npy")))
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, "empty")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Тесты восстановления после ошибок чтения кадров (FrameReader и fill_missing)
+
+Вместо cv2.VideoCapture используется FakeCapture, который считает чтения и
+отдает кадры только для заданного набора номеров.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from colager import core
+
+
+class FakeCapture:
+    """Видео, в котором декодируются только кадры из readable"""
+
+    def __init__(self, readable):
+        self.readable = set(readable)
+        self.position = 0
+        self.reads = []
+
+    def set(self, prop, value):
+        self.position = int(value)
+        return True
+
+    def read(self):
+        self.reads.append(self.position)
+        if self.position in self.readable:
+            return True, f"frame {self.position}"
+        return False, None
+
+
+def read_all(cap, total_frames, num_screenshots=9):
+    """Повторяет цикл extract_screenshots без конвертации кадров"""
+    reader = core.FrameReader(cap, total_frames, num_screenshots)
+    screenshots = []
+    substitutions = []
+    for i, frame_index in enumerate(core.sample_indices(total_frames, num_screenshots)):
+        used_index, frame = reader.read(frame_index)
+        if frame is not None and used_index != frame_index:
+            substitutions.append({"tile": i, "requested": frame_index, "used": used_index})
+        screenshots.append(frame)
+    return reader, core.fill_missing(screenshots, substitutions), substitutions
+
+
+def read_budget(num_screenshots=9):
+    """Максимум чтений: одно на скриншот плюс общий запас на восстановление"""
+    return num_screenshots + core.EXTRA_READS_PER_SCREENSHOT * num_screenshots
+
+
+class FrameReaderTest(unittest.TestCase):
+    def test_readable_video_reads_each_frame_once(self):
+        cap = FakeCapture(range(900))
+        reader, screenshots, substitutions = read_all(cap, 900)
+        self.assertEqual(cap.reads, core.sample_indices(900, 9))
+        self.assertEqual(substitutions, [])
+        self.assertFalse(reader.end_checked)
+
+    def test_overestimated_frame_count_spreads_tail_points(self):
+        # Заявлено 900 кадров, реально читаются только первые 500
+        cap = FakeCapture(range(500))
+        reader, screenshots, substitutions = read_all(cap, 900)
+        self.assertEqual(len(screenshots), 9)
+        self.assertTrue(all(frame is not None for frame in screenshots))
+        self.assertLessEqual(len(cap.reads), read_budget())
+        # Граница найдена с точностью до шага повторных попыток
+        precision = max(1, reader.max_offset // core.RETRY_ATTEMPTS)
+        self.assertLess(reader.last_frame, 500)
+        self.assertGreaterEqual(reader.last_frame, 500 - precision)
+        # Точки за концом заменены разными кадрами внутри читаемой части
+        used = [item["used"] for item in substitutions]
+        self.assertEqual([item["tile"] for item in substitutions], [5, 6, 7, 8])
+        self.assertEqual(len(set(used)), len(used))
+        self.assertTrue(all(450 <= index <= reader.last_frame for index in used))
+        self.assertEqual(used, sorted(used))
+
+    def test_damaged_middle_uses_neighbours(self):
+        # Поврежден участок вокруг центрального скриншота (кадр 450)
+        cap = FakeCapture(set(range(900)) - set(range(430, 470)))
+        reader, screenshots, substitutions = read_all(cap, 900)
+        self.assertTrue(all(frame is not None for frame in screenshots))
+        self.assertEqual(len(substitutions), 1)
+        self.assertEqual(substitutions[0]["tile"], 4)
+        self.assertEqual(substitutions[0]["requested"], 450)
+        used = substitutions[0]["used"]
+        self.assertTrue(used < 430 or used >= 470)
+        self.assertLessEqual(abs(used - 450), reader.max_offset)
+        # Конец видео читается, поэтому граница не сдвигается
+        self.assertEqual(reader.last_frame, 899)
+        self.assertLessEqual(len(cap.reads), read_budget())
+
+    def test_nothing_decodable_stays_within_budget(self):
+        cap = FakeCapture([])
+        reader, screenshots, substitutions = read_all(cap, 900)
+        self.assertEqual(screenshots, [])
+        self.assertEqual(substitutions, [])
+        self.assertLessEqual(len(cap.reads), read_budget())
+        # Без единого прочитанного кадра конец видео не считается известным
+        self.assertEqual(reader.last_frame, 899)
+
+    def test_unreadable_first_frame_is_not_assumed_readable(self):
+        # Читается только один кадр в середине: кадр 0 проверяется, а не принимается на веру
+        cap = FakeCapture([450])
+        reader = core.FrameReader(cap, 900, 9)
+        self.assertEqual(reader.read(850), (None, None))
+        self.assertIn(0, cap.reads)
+        self.assertEqual(reader.last_frame, 899)
+
+
+class FillMissingTest(unittest.TestCase):
+    def test_copies_nearest_frame(self):
+        substitutions = [{"tile": 3, "requested": 40, "used": 38}]
+        screenshots = core.fill_missing(["a", None, "c", "d", None], substitutions)
+        self.assertEqual(screenshots, ["a", "a", "c", "d", "d"])
+        self.assertEqual([item["tile"] for item in substitutions], [1, 3, 4])
+        self.assertEqual(substitutions[0]["used"], "копия 1")
+        self.assertEqual(substitutions[2]["used"], "копия 4")
+
+    def test_nothing_read_returns_empty_list(self):
+        substitutions = []
+        self.assertEqual(core.fill_missing([None, None], substitutions), [])
+        self.assertEqual(substitutions, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,108 +1,64 @@
 import os
-try:
-    import cv2
-except ImportError:
-    print("Ошибка: Не удалось импортировать cv2. Установите: pip install opencv-python")
-    exit(1)
-try:
-    import numpy as np
-except ImportError:
-    print("Ошибка: Не удалось импортировать numpy. Установите: pip install numpy")
-    exit(1)
-try:
-    from PIL import Image
-except ImportError:
-    print("Ошибка: Не удалось импортировать PIL. Установите: pip install Pillow")
-    exit(1)
-import math
+import time
+import argparse
 
-def get_video_duration(video_path):
-    """Получает длительность видео в секундах"""
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = frame_count / fps
-    cap.release()
-    return duration
+from colager.core import (
+    VIDEO_EXTENSIONS,
+    extract_screenshots,
+    format_substitutions,
+    create_collage,
+)
+# Реэкспорт: раньше эти функции были определены в этом модуле
+from colager.core import get_video_duration, create_aspect_collage  # noqa: F401
 
-def extract_screenshots(video_path, num_screenshots=9):
-    """Извлекает указанное количество скриншотов из видео"""
-    cap = cv2.VideoCapture(video_path)
-    
-    if not cap.isOpened():
-        print(f"Ошибка: Не удалось открыть видео {video_path}")
-        return []
-    
-    # Получаем информацию о видео
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    
-    # Вычисляем кадры для извлечения скриншотов
-    frame_indices = []
-    for i in range(num_screenshots):
-        frame_index = int((i + 0.5) * total_frames / num_screenshots)
-        frame_indices.append(frame_index)
-    
-    screenshots = []
-    
-    for frame_index in frame_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-        ret, frame = cap.read()
-        
-        if ret:
-            # Конвертируем BGR в RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            screenshots.append(frame_rgb)
-        else:
-            print(f"Ошибка при чтении кадра {frame_index}")
-    
-    cap.release()
-    return screenshots
+def process_video(video_path, output_path):
+    """Создает коллаж для одного видео
 
-def create_collage(screenshots, output_path):
-    """Создает коллаж из скриншотов 3x3"""
-    if len(screenshots) != 9:
-        print(f"Ошибка: ожидается 9 скриншотов, получено {len(screenshots)}")
-        return False
-    
-    # Определяем размеры для каждого скриншота
-    # Используем размер первого скриншота как базовый
-    base_height, base_width = screenshots[0].shape[:2]
-    
-    # Вычисляем размер для каждого скриншота в коллаже
-    # Делаем их квадратными для равномерности
-    target_size = min(base_width, base_height)
-    
-    # Создаем пустой коллаж
-    collage_width = target_size * 3
-    collage_height = target_size * 3
-    collage = np.zeros((collage_height, collage_width, 3), dtype=np.uint8)
-    
-    # Размещаем скриншоты в коллаже
-    for i, screenshot in enumerate(screenshots):
-        row = i // 3
-        col = i % 3
+    Возвращает (параметры видео, успех, секунды, сообщения). Сообщения не печатаются
+    сразу, чтобы вывод параллельных процессов (--workers) не перемешивался.
+    """
+    from colager.job_scheduler import probe_video
+    
+    video_file = os.path.basename(video_path)
+    messages = []
+    succeeded = False
+    # Параметры видео считываются только перед его обработкой; время замеряется после,
+    # чтобы загрузка OpenCV в новом процессе не попадала в историю стоимости
+    job = probe_video(video_path)
+    started = time.perf_counter()
+    
+    try:
+        messages.append(f"Длительность: {job.duration:.2f} секунд")
         
-        # Изменяем размер скриншота
-        resized = cv2.resize(screenshot, (target_size, target_size))
+        # Извлекаем скриншоты
+        substitutions = []
+        screenshots = extract_screenshots(video_path, 9, substitutions)
+        if substitutions:
+            messages.append(f"Заменены нечитаемые кадры: {format_substitutions(substitutions)}")
         
-        # Вычисляем позицию в коллаже
-        y_start = row * target_size
-        y_end = (row + 1) * target_size
-        x_start = col * target_size
-        x_end = (col + 1) * target_size
-        
-        # Вставляем скриншот в коллаж
-        collage[y_start:y_end, x_start:x_end] = resized
-    
-    # Сохраняем коллаж
-    collage_pil = Image.fromarray(collage)
-    collage_pil.save(output_path, 'JPEG', quality=95)
+        if len(screenshots) == 9:
+            # Создаем коллаж
+            if create_collage(screenshots, output_path):
+                messages.append(f"Коллаж сохранен: {output_path}")
+                succeeded = True
+            else:
+                messages.append(f"Ошибка при создании коллажа для {video_file}")
+        else:
+            messages.append(f"Не удалось извлечь 9 скриншотов из {video_file}")
+            
+    except Exception as e:
+        messages.append(f"Ошибка при обработке {video_file}: {str(e)}")
     
-    return True
+    return job, succeeded, time.perf_counter() - started, messages
+
+def process_videos(policy="shortest", priority_folders=(), prefetch_mb=64, workers=1):
+    """Обрабатывает все видео файлы в папке Video в порядке, заданном политикой планировщика
 
-def process_videos():
-    """Обрабатывает все видео файлы в папке Video"""
+    workers > 1 — видео обрабатываются параллельно в пуле процессов.
+    """
+    from colager.job_scheduler import JobScheduler
+    from colager.prefetch import Prefetcher
+    
     video_folder = "Video"
     output_folder = "colage"
     
@@ -110,13 +66,36 @@ def process_videos():
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
-    # Получаем список видео файлов
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
+    # Получаем список видео файлов (видео из приоритетных папок тоже обрабатываются)
     video_files = []
-    
-    for file in os.listdir(video_folder):
-        if any(file.lower().endswith(ext) for ext in video_extensions):
-            video_files.append(file)
+    output_names = {}  # путь к видео -> имя коллажа без расширения
+    used_names = set()
+    seen = set()
+    
+    for folder in [video_folder, *priority_folders]:
+        if not os.path.isdir(folder):
+            print(f"Папка {folder} не найдена, пропускаю")
+            continue
+        for file in os.listdir(folder):
+            if not any(file.lower().endswith(ext) for ext in VIDEO_EXTENSIONS):
+                continue
+            path = os.path.join(folder, file)
+            # Одна и та же папка, указанная дважды, не обрабатывается повторно
+            real_path = os.path.realpath(path)
+            if real_path in seen:
+                continue
+            seen.add(real_path)
+            video_files.append(path)
+            # Одноименные видео из разных папок получают коллажи с префиксом папки
+            base_name = os.path.splitext(file)[0]
+            prefix = os.path.basename(os.path.normpath(folder))
+            name = base_name
+            suffix = 1
+            while name in used_names:
+                name = f"{prefix}_{base_name}" + (f"_{suffix}" if suffix > 1 else "")
+                suffix += 1
+            used_names.add(name)
+            output_names[path] = name
     
     if not video_files:
         print("Видео файлы не найдены в папке Video")
@@ -124,36 +103,74 @@ def process_videos():
     
     print(f"Найдено {len(video_files)} видео файлов")
     
-    for video_file in video_files:
-        video_path = os.path.join(video_folder, video_file)
-        print(f"\nОбрабатываю: {video_file}")
+    # Оцениваем стоимость каждого видео и выбираем порядок обработки
+    scheduler = JobScheduler(priority_folders=priority_folders)
+    jobs = scheduler.order(scheduler.make_jobs(video_files), policy)
+    if policy == "longest" and workers == 1:
+        print("Порядок longest сокращает общее время только при --workers больше 1")
+    # Пока обрабатывается текущее видео, следующее прогревается в кэше ОС
+    prefetcher = Prefetcher(budget_bytes=prefetch_mb * 1024 * 1024)
+    
+    def report(result):
+        probed, succeeded, seconds, messages = result
+        for message in messages:
+            print(message)
+        # Фактическое время успешных видео уточняет модель стоимости для следующих запусков
+        if succeeded:
+            scheduler.record(probed, 9, seconds)
+    
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        import multiprocessing
         
-        try:
-            # Получаем длительность видео
-            duration = get_video_duration(video_path)
-            print(f"Длительность: {duration:.2f} секунд")
-            
-            # Извлекаем скриншоты
-            screenshots = extract_screenshots(video_path, 9)
-            
-            if len(screenshots) == 9:
-                # Создаем имя выходного файла
-                base_name = os.path.splitext(video_file)[0]
-                output_path = os.path.join(output_folder, f"{base_name}.jpg")
-                
-                # Создаем коллаж
-                if create_collage(screenshots, output_path):
-                    print(f"Коллаж сохранен: {output_path}")
-                else:
-                    print(f"Ошибка при создании коллажа для {video_file}")
-            else:
-                print(f"Не удалось извлечь 9 скриншотов из {video_file}")
-                
-        except Exception as e:
-            print(f"Ошибка при обработке {video_file}: {str(e)}")
+        # Пул отдает задачи освободившимся процессам в порядке очереди: при порядке
+        # longest это LPT — длинные видео начинаются первыми, короткие заполняют конец
+        print(f"Обработка в {workers} процессах")
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        with executor:
+            futures = {}
+            for job in jobs:
+                output_path = os.path.join(output_folder, f"{output_names[job.path]}.jpg")
+                futures[executor.submit(process_video, job.path, output_path)] = job
+            # Прогревается видео, которое начнется следующим после освобождения процесса
+            next_job = workers
+            if next_job < len(jobs):
+                prefetcher.prefetch(jobs[next_job].path, 9)
+            for future in as_completed(futures):
+                next_job += 1
+                if next_job < len(jobs):
+                    prefetcher.prefetch(jobs[next_job].path, 9)
+                video_file = futures[future].name
+                print(f"\nОбработано: {video_file}")
+                try:
+                    report(future.result())
+                except Exception as e:
+                    print(f"Ошибка при обработке {video_file}: {str(e)}")
+    else:
+        for i, job in enumerate(jobs):
+            if i + 1 < len(jobs):
+                prefetcher.prefetch(jobs[i + 1].path, 9)
+            print(f"\nОбрабатываю: {job.name}")
+            output_path = os.path.join(output_folder, f"{output_names[job.path]}.jpg")
+            report(process_video(job.path, output_path))
+    
+    prefetcher.close()
+    scheduler.cost_model.save()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Создание коллажей из видео в папке Video")
+    parser.add_argument("--order", choices=["fifo", "shortest", "longest"], default="shortest",
+                        help="Порядок обработки: как в папке, сначала короткие или сначала длинные "
+                             "(выгодно при --workers больше 1)")
+    parser.add_argument("--priority-folder", action="append", default=[],
+                        help="Дополнительная папка с видео, которые обрабатываются первыми (можно указать несколько раз)")
+    parser.add_argument("--prefetch-mb", type=int, default=64,
+                        help="Сколько МБ следующего видео прогревать заранее (0 — отключить)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Количество процессов для параллельной обработки видео")
+    args = parser.parse_args()
+    
     print("Программа для создания коллажей из видео")
     print("=" * 50)
-    process_videos()
+    process_videos(args.order, args.priority_folder, args.prefetch_mb, max(1, args.workers))
     print("\nОбработка завершена!") 
\ No newline at end of file
@@ -2,27 +2,6 @@ import os
 import sys
 import threading
 import time
-import math
-try:
-    import cv2
-except ImportError:
-    print("Ошибка: Не удалось импортировать cv2. Установите: pip install opencv-python")
-    exit(1)
-try:
-    import numpy as np
-except ImportError:
-    print("Ошибка: Не удалось импортировать numpy. Установите: pip install numpy")
-    exit(1)
-try:
-    from PIL import Image
-    try:
-        from PIL.Image import Resampling
-        RESAMPLE = Resampling.LANCZOS
-    except ImportError:
-        RESAMPLE = 1  # LANCZOS/ANTIALIAS для старых Pillow
-except ImportError:
-    print("Ошибка: Не удалось импортировать PIL. Установите: pip install Pillow")
-    exit(1)
 try:
     import tkinter as tk
     from tkinter import ttk, messagebox, filedialog
@@ -30,23 +9,63 @@ except ImportError:
     print("Ошибка: tkinter не найден. Установите Python с tkinter.")
     exit(1)
 
+# OpenCV, NumPy и Pillow загружаются лениво, чтобы окно появлялось сразу
+from colager import core
+from colager.lazy import cv2, missing_dependencies
+from colager.frame_cache import FrameCache
+from colager.throughput_monitor import ThroughputMonitor, STAGES, STAGE_NAMES
+from colager.job_scheduler import JobScheduler, POLICY_NAMES, SEQUENTIAL_POLICIES, probe_video
+from colager.prefetch import Prefetcher
+from colager.video_list import VideoListModel
+
+class ProcessingCancelled(Exception):
+    """Обработка остановлена пользователем"""
+
 class VideoCollageGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Создание коллажей из видео")
-        self.root.geometry("600x580")
+        self.root.geometry("600x700")
         self.root.resizable(True, True)
         
         # Переменные
         self.video_folder = tk.StringVar(value="Video")
         self.output_folder = tk.StringVar(value="colage")
         self.processing = False
+        # Остановка и пауза проверяются между каждым поиском и декодированием кадра
+        self.stop_event = threading.Event()
+        self.resume_event = threading.Event()
+        self.resume_event.set()
         self.video_files = []
+        self.video_durations = {}  # имя файла -> длительность, для оценки оставшегося времени
+        self.known_jobs = {}  # путь -> VideoJob из фонового определения параметров
+        # Список файлов хранится в модели; в Treeview вставляются только видимые строки
+        self.video_model = VideoListModel()
+        self.filter_var = tk.StringVar()
+        self.list_offset = 0  # индекс первой видимой строки
+        self.visible_rows = 8
+        self.row_items = []  # переиспользуемые строки Treeview
+        self.filter_job = None
+        self.probe_generation = 0  # увеличивается при каждом обновлении списка
+        self.probe_done = 0
         self.aspect_var = tk.StringVar(value="16:9")  # Новая переменная для формата
         self.num_images_var = tk.IntVar(value=9)  # Новая переменная для количества картинок
+        self.prefetch_mb_var = tk.IntVar(value=64)  # Сколько МБ следующего видео прогревать заранее
+        self.order_var = tk.StringVar(value=POLICY_NAMES["shortest"])  # Порядок обработки
+        self.scheduler = JobScheduler()
+        # Прогрев следующего видео, пока обрабатывается текущее (медленные сетевые диски)
+        self.prefetcher = Prefetcher()
+        # Кэш уменьшенных кадров: смена формата не требует повторного декодирования,
+        # а при смене количества картинок декодируются только кадры для участков без кэша
+        self.frame_cache = FrameCache()
+        # Метрики производительности; обновляются потоком обработки, отображаются по таймеру
+        self.monitor = ThroughputMonitor()
+        self.dashboard_interval_ms = 500
         
         self.setup_ui()
         self.check_folders()
+        # Зависимости проверяются после отрисовки окна
+        self.root.after(100, self.check_dependencies)
         
     def setup_ui(self):
         # Главный фрейм
@@ -72,11 +91,26 @@ class VideoCollageGUI:
         
         # Количество картинок
         ttk.Label(main_frame, text="Картинок в коллаже:").grid(row=2, column=0, sticky="w", pady=5)
-        num_images_cb = ttk.Combobox(main_frame, textvariable=self.num_images_var, state="readonly", width=10)
+        options_frame = ttk.Frame(main_frame)
+        options_frame.grid(row=2, column=1, columnspan=2, sticky="w", pady=5)
+        num_images_cb = ttk.Combobox(options_frame, textvariable=self.num_images_var, state="readonly", width=10)
         num_images_cb['values'] = (4, 6, 9, 12, 16)
-        num_images_cb.grid(row=2, column=1, sticky="w", pady=5)
+        num_images_cb.pack(side=tk.LEFT)
         num_images_cb.current(2)  # по умолчанию 9
         
+        # Порядок обработки
+        ttk.Label(options_frame, text="Порядок:").pack(side=tk.LEFT, padx=(20, 5))
+        order_cb = ttk.Combobox(options_frame, textvariable=self.order_var, state="readonly", width=18)
+        # GUI обрабатывает видео по одному, поэтому порядок longest не предлагается
+        order_cb['values'] = [POLICY_NAMES[policy] for policy in SEQUENTIAL_POLICIES]
+        order_cb.pack(side=tk.LEFT)
+        
+        # Объем упреждающего чтения следующего видео (0 — отключить)
+        ttk.Label(options_frame, text="Прогрев, МБ:").pack(side=tk.LEFT, padx=(20, 5))
+        prefetch_cb = ttk.Combobox(options_frame, textvariable=self.prefetch_mb_var, state="readonly", width=6)
+        prefetch_cb['values'] = (0, 16, 64, 256)
+        prefetch_cb.pack(side=tk.LEFT)
+        
         # Папка с видео
         ttk.Label(main_frame, text="Папка с видео:").grid(row=3, column=0, sticky="w", pady=5)
         video_entry = ttk.Entry(main_frame, textvariable=self.video_folder, width=40)
@@ -99,17 +133,25 @@ class VideoCollageGUI:
         self.process_btn = ttk.Button(button_frame, text="Создать коллажи", command=self.start_processing)
         self.process_btn.pack(side=tk.LEFT, padx=5)
         
+        self.pause_btn = ttk.Button(button_frame, text="Пауза", command=self.toggle_pause, state="disabled")
+        self.pause_btn.pack(side=tk.LEFT, padx=5)
+        
         # Список видео файлов
         ttk.Label(main_frame, text="Найденные видео файлы:").grid(row=6, column=0, sticky="w", pady=(20, 5))
+        filter_frame = ttk.Frame(main_frame)
+        filter_frame.grid(row=6, column=1, columnspan=2, sticky="e", pady=(20, 5))
+        ttk.Label(filter_frame, text="Фильтр:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=25).pack(side=tk.LEFT)
+        self.filter_var.trace_add("write", self.schedule_filter)
         
         # Создаем Treeview для списка файлов
         columns = ("Имя файла", "Размер", "Длительность")
         self.video_tree = ttk.Treeview(main_frame, columns=columns, show="headings", height=8)
         
-        # Настройка колонок
-        self.video_tree.heading("Имя файла", text="Имя файла")
-        self.video_tree.heading("Размер", text="Размер")
-        self.video_tree.heading("Длительность", text="Длительность")
+        # Настройка колонок (клик по заголовку — сортировка)
+        self.column_keys = {"Имя файла": "name", "Размер": "size", "Длительность": "duration"}
+        for column, key in self.column_keys.items():
+            self.video_tree.heading(column, text=column, command=lambda key=key: self.sort_videos(key))
         
         self.video_tree.column("Имя файла", width=200)
         self.video_tree.column("Размер", width=100)
@@ -117,34 +159,92 @@ class VideoCollageGUI:
         
         self.video_tree.grid(row=7, column=0, columnspan=3, sticky="nsew", pady=5)
         
-        # Скроллбар для списка
-        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.video_tree.yview)
-        scrollbar.grid(row=7, column=3, sticky="ns")
-        self.video_tree.configure(yscrollcommand=scrollbar.set)
+        # Скроллбар для списка прокручивает модель, а не Treeview
+        self.list_scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.on_list_scroll)
+        self.list_scrollbar.grid(row=7, column=3, sticky="ns")
+        self.video_tree.bind("<Configure>", self.on_tree_resize)
+        self.video_tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.video_tree.bind("<Button-4>", self.on_mouse_wheel)
+        self.video_tree.bind("<Button-5>", self.on_mouse_wheel)
         
         # Прогресс бар
         ttk.Label(main_frame, text="Прогресс:").grid(row=8, column=0, sticky="w", pady=(20, 5))
         self.progress = ttk.Progressbar(main_frame, mode='determinate')
         self.progress.grid(row=9, column=0, columnspan=3, sticky="ew", pady=5)
         
+        # Панель производительности
+        dashboard = ttk.LabelFrame(main_frame, text="Производительность", padding="5")
+        dashboard.grid(row=10, column=0, columnspan=3, sticky="ew", pady=5)
+        dashboard.columnconfigure(0, weight=1)
+        self.throughput_var = tk.StringVar(value="Кадров/с: — | Чтение: — МБ/с | Осталось: —")
+        ttk.Label(dashboard, textvariable=self.throughput_var).grid(row=0, column=0, sticky="w")
+        self.stages_var = tk.StringVar(value="Этапы: —")
+        ttk.Label(dashboard, textvariable=self.stages_var).grid(row=1, column=0, sticky="w")
+        self.history_canvas = tk.Canvas(dashboard, width=160, height=40, background="white",
+                                        highlightthickness=1, highlightbackground="gray")
+        self.history_canvas.grid(row=0, column=1, rowspan=2, padx=(10, 0))
+        
         # Статус
         self.status_var = tk.StringVar(value="Готов к работе")
         status_label = ttk.Label(main_frame, textvariable=self.status_var, font=("Arial", 10))
-        status_label.grid(row=10, column=0, columnspan=3, pady=10)
+        status_label.grid(row=11, column=0, columnspan=3, pady=10)
         
         # Лог
-        ttk.Label(main_frame, text="Лог операций:").grid(row=11, column=0, sticky="w", pady=(20, 5))
+        ttk.Label(main_frame, text="Лог операций:").grid(row=12, column=0, sticky="w", pady=(20, 5))
         self.log_text = tk.Text(main_frame, height=6, width=70)
-        self.log_text.grid(row=12, column=0, columnspan=3, sticky="nsew", pady=5)
+        self.log_text.grid(row=13, column=0, columnspan=3, sticky="nsew", pady=5)
         
         # Скроллбар для лога
         log_scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=self.log_text.yview)
-        log_scrollbar.grid(row=12, column=3, sticky="ns")
+        log_scrollbar.grid(row=13, column=3, sticky="ns")
         self.log_text.configure(yscrollcommand=log_scrollbar.set)
         
         # Настройка весов для растягивания
         main_frame.rowconfigure(7, weight=1)
-        main_frame.rowconfigure(12, weight=1)
+        main_frame.rowconfigure(13, weight=1)
+        
+    def format_eta(self, seconds):
+        """Форматирует оставшееся время"""
+        if seconds is None:
+            return "—"
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        return f"{seconds // 60}:{seconds % 60:02d}"
+        
+    def update_dashboard(self):
+        """Обновляет панель производительности (вызывается по таймеру в главном потоке)"""
+        stats = self.monitor.snapshot()
+        self.throughput_var.set(
+            f"Кадров/с: {stats['fps']:.1f} | Чтение: {stats['mb_per_s']:.1f} МБ/с | "
+            f"Осталось: {self.format_eta(stats['eta'])}"
+        )
+        split = stats["stage_split"]
+        self.stages_var.set("Этапы: " + " · ".join(
+            f"{STAGE_NAMES[name]} {split[name] * 100:.0f}%" for name in STAGES
+        ))
+        self.progress["value"] = stats["fraction"] * 100
+        self.draw_history()
+        if self.processing:
+            self.root.after(self.dashboard_interval_ms, self.update_dashboard)
+            
+    def draw_history(self):
+        """Рисует график кадров в секунду за последние замеры"""
+        canvas = self.history_canvas
+        canvas.delete("all")
+        values = [fps for _, fps, _ in self.monitor.history]
+        if len(values) < 2:
+            return
+        width = int(canvas["width"])
+        height = int(canvas["height"])
+        peak = max(values) or 1.0
+        step = width / (self.monitor.history.maxlen - 1)
+        offset = width - step * (len(values) - 1)
+        points = []
+        for i, value in enumerate(values):
+            points.extend((offset + i * step, height - 2 - value / peak * (height - 4)))
+        canvas.create_line(*points, fill="#2a7ae2")
+        canvas.create_text(2, 2, anchor="nw", text=f"{peak:.0f}", font=("Arial", 7))
         
     def log_message(self, message):
         """Добавляет сообщение в лог"""
@@ -186,139 +286,247 @@ class VideoCollageGUI:
             except Exception as e:
                 self.log_message(f"Ошибка создания папки {output_path}: {e}")
                 
+    def check_dependencies(self):
+        """Загружает OpenCV, NumPy и Pillow и сообщает, если чего-то не хватает"""
+        missing = missing_dependencies()
+        if missing:
+            for hint in missing:
+                self.log_message(f"❌ Не установлена зависимость {hint}")
+            self.process_btn.config(state="disabled")
+            messagebox.showerror("Ошибка", "Не установлены зависимости:\n" + "\n".join(missing))
+            
     def get_file_size(self, file_path):
         """Получает размер файла в читаемом формате"""
-        size = os.path.getsize(file_path)
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        return core.get_file_size(file_path)
         
     def get_video_duration(self, video_path):
         """Получает длительность видео в секундах"""
-        try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                return 0
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count / fps
-            cap.release()
-            return duration
-        except Exception:
-            return 0
+        return core.get_video_duration(video_path)
             
     def refresh_videos(self):
         """Обновляет список видео файлов"""
-        self.video_tree.delete(*self.video_tree.get_children())
+        self.probe_generation += 1  # останавливает определение длительности для старого списка
+        previous = self.video_model
+        self.video_model = VideoListModel()
+        self.video_model.filter_text = self.filter_var.get().strip().lower()
+        # Сортировка сохраняется, чтобы стрелка на заголовке соответствовала порядку строк
+        self.video_model.sort_key = previous.sort_key
+        self.video_model.sort_reverse = previous.sort_reverse
         self.video_files = []
+        self.video_durations = {}
+        self.list_offset = 0
         
         video_path = self.video_folder.get()
         if not os.path.exists(video_path):
+            self.render_rows()
             self.log_message(f"Папка {video_path} не существует")
             return
             
-        video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
-        
-        for file in os.listdir(video_path):
-            if any(file.lower().endswith(ext) for ext in video_extensions):
-                file_path = os.path.join(video_path, file)
-                size = self.get_file_size(file_path)
-                duration = self.get_video_duration(file_path)
-                duration_str = f"{duration:.1f}s" if duration > 0 else "Ошибка"
-                
-                self.video_tree.insert("", tk.END, values=(file, size, duration_str))
-                self.video_files.append(file)
-                
+        self.video_model.scan(video_path)
+        self.video_files = [entry.name for entry in self.video_model.entries]
+        self.render_rows()
+        
         self.log_message(f"Найдено {len(self.video_files)} видео файлов")
         self.status_var.set(f"Найдено {len(self.video_files)} видео файлов")
         
-    def extract_screenshots(self, video_path, num_screenshots=None):
-        """Извлекает указанное количество скриншотов из видео"""
+        # Длительность определяется в фоне, начиная с видимых строк
+        self.probe_done = 0
+        entries = self.video_model.visible_entries()
+        visible = set(map(id, entries[:self.visible_rows]))
+        entries = entries[:self.visible_rows] + [e for e in self.video_model.entries if id(e) not in visible]
+        thread = threading.Thread(target=self.probe_durations, args=(entries, self.probe_generation))
+        thread.daemon = True
+        thread.start()
+        self.root.after(300, self.poll_durations, self.probe_generation)
+        
+    def probe_durations(self, entries, generation):
+        """Поток, определяющий параметры видео (к виджетам не обращается)
+
+        Считанные параметры сохраняются в записи списка и используются планировщиком.
+        Пока идет обработка, поток ждет, чтобы не отнимать у декодера чтение с диска
+        и не искажать скорость чтения на панели производительности.
+        """
+        for entry in entries:
+            while self.processing and generation == self.probe_generation:
+                time.sleep(0.5)
+            if generation != self.probe_generation:
+                return
+            try:
+                entry.job = probe_video(entry.path)
+                entry.duration = entry.job.duration
+            except Exception:
+                entry.duration = 0  # ошибка чтения, как у get_video_duration
+            self.probe_done += 1
+            
+    def poll_durations(self, generation):
+        """Периодически перерисовывает видимые строки, пока определяется длительность"""
+        if generation != self.probe_generation:
+            return
+        self.render_rows()
+        total = len(self.video_model.entries)
+        if self.probe_done < total:
+            if not self.processing:
+                self.status_var.set(f"Определение длительности: {self.probe_done}/{total}")
+            self.root.after(500, self.poll_durations, generation)
+            return
+        if self.video_model.sort_key == "duration":
+            self.video_model.refresh_view()
+            self.render_rows()
+        if not self.processing:
+            self.status_var.set(f"Найдено {total} видео файлов")
+            
+    def render_rows(self):
+        """Показывает в Treeview только видимое окно модели, переиспользуя строки"""
+        total = len(self.video_model)
+        self.list_offset = max(0, min(self.list_offset, total - self.visible_rows))
+        count = max(0, min(self.visible_rows, total - self.list_offset))
+        while len(self.row_items) > count:
+            self.video_tree.delete(self.row_items.pop())
+        while len(self.row_items) < count:
+            self.row_items.append(self.video_tree.insert("", tk.END))
+        for k, item in enumerate(self.row_items):
+            self.video_tree.item(item, values=self.video_model.row(self.list_offset + k))
+        if total:
+            self.list_scrollbar.set(self.list_offset / total, (self.list_offset + count) / total)
+        else:
+            self.list_scrollbar.set(0, 1)
+            
+    def scroll_list_to(self, offset):
+        self.list_offset = int(offset)
+        self.render_rows()
+        
+    def on_list_scroll(self, action, amount, unit=None):
+        """Обработчик скроллбара: moveto <доля> или scroll <n> units/pages"""
+        if action == "moveto":
+            self.scroll_list_to(float(amount) * len(self.video_model))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_list_to(self.list_offset + int(amount) * step)
+            
+    def on_mouse_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_list_to(self.list_offset - 3)
+        else:
+            self.scroll_list_to(self.list_offset + 3)
+        return "break"
+        
+    def on_tree_resize(self, event):
+        """Пересчитывает число видимых строк по высоте виджета"""
+        style = ttk.Style()
+        try:
+            row_height = int(style.lookup("Treeview", "rowheight") or 20)
+        except (ValueError, tk.TclError):
+            row_height = 20
+        rows = max(1, (event.height - row_height - 6) // row_height)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render_rows()
+            
+    def sort_videos(self, key):
+        """Сортирует список по колонке; повторный клик меняет направление"""
+        self.video_model.sort_by(key)
+        # Отсортированный список обрабатывается в том порядке, в котором он показан
+        self.order_var.set(POLICY_NAMES["fifo"])
+        arrow = " ▼" if self.video_model.sort_reverse else " ▲"
+        for column, column_key in self.column_keys.items():
+            self.video_tree.heading(column, text=column + (arrow if column_key == key else ""))
+        self.list_offset = 0
+        self.render_rows()
+        
+    def schedule_filter(self, *args):
+        """Применяет фильтр с небольшой задержкой, чтобы не пересчитывать список на каждую букву"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(150, self.apply_filter)
+        
+    def apply_filter(self):
+        self.filter_job = None
+        self.video_model.set_filter(self.filter_var.get())
+        self.list_offset = 0
+        self.render_rows()
+        
+    def check_cancel(self):
+        """Ждет, пока обработка на паузе, и прерывает ее, если нажата остановка"""
+        while not self.resume_event.wait(0.1):
+            if self.stop_event.is_set():
+                break
+        if self.stop_event.is_set():
+            raise ProcessingCancelled()
+            
+    def extract_screenshots(self, video_path, num_screenshots=None, substitutions=None):
+        """Извлекает указанное количество скриншотов из видео (с использованием кэша кадров)
+
+        Нечитаемые кадры заменяются соседними; сведения о заменах добавляются в substitutions.
+        """
         if num_screenshots is None:
             num_screenshots = self.num_images_var.get()
-        cap = cv2.VideoCapture(video_path)
+        if substitutions is None:
+            substitutions = []
+        video_key = self.frame_cache.video_key(video_path)
+        meta = self.frame_cache.get_meta(video_key)
+        cap = None
         
-        if not cap.isOpened():
-            return []
-        
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if meta is None:
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                return []
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.frame_cache.put_meta(video_key, total_frames, cap.get(cv2.CAP_PROP_FPS))
+        else:
+            total_frames = meta[0]
         
-        frame_indices = []
-        for i in range(num_screenshots):
-            frame_index = int((i + 0.5) * total_frames / num_screenshots)
-            frame_indices.append(frame_index)
+        frame_indices = core.sample_indices(total_frames, num_screenshots)
         
         screenshots = []
+        reader = None
         
-        for frame_index in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-            ret, frame = cap.read()
-            
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                screenshots.append(frame_rgb)
-        
-        cap.release()
-        return screenshots
+        try:
+            for i, frame_index in enumerate(frame_indices):
+                cached = self.frame_cache.get(video_key, frame_index, total_frames, num_screenshots)
+                if cached is not None:
+                    screenshots.append(cached)
+                    self.monitor.frame_done(decoded=False)
+                    continue
+                # Видео открывается только при первом промахе кэша
+                if cap is None:
+                    cap = cv2.VideoCapture(video_path)
+                    if not cap.isOpened():
+                        return []
+                if reader is None:
+                    reader = core.FrameReader(cap, total_frames, num_screenshots,
+                                              stage=self.monitor.stage, check=self.check_cancel)
+                used_index, frame = reader.read(frame_index)
+                
+                if frame is not None:
+                    if used_index != frame_index:
+                        substitutions.append({"tile": i, "requested": frame_index, "used": used_index})
+                    with self.monitor.stage("resize"):
+                        frame_rgb = self.frame_cache.downscale(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                    # Запись в кэш — дисковая операция, в этап масштабирования она не входит
+                    self.frame_cache.put(video_key, used_index, frame_rgb)
+                    screenshots.append(frame_rgb)
+                else:
+                    screenshots.append(None)
+                self.monitor.frame_done()
+        finally:
+            if cap is not None:
+                cap.release()
+        return core.fill_missing(screenshots, substitutions)
         
     def create_collage(self, screenshots, output_path):
         """Создает коллаж из скриншотов с сохранением пропорций и нужным соотношением сторон"""
-        import math
         num_images = self.num_images_var.get()
         if len(screenshots) != num_images:
             return False
-        # Вычисляем наиболее квадратную сетку
-        cols = math.ceil(math.sqrt(num_images))
-        rows = math.ceil(num_images / cols)
-        # --- Масштабируем кадры с сохранением пропорций ---
-        # Сначала определим высоту для всех кадров в строке
-        min_height = min(frame.shape[0] for frame in screenshots)
-        min_width = min(frame.shape[1] for frame in screenshots)
-        # Для горизонтальных коллажей (16:9) — приводим к одной высоте, для вертикальных (9:16) — к одной ширине
-        aspect = self.aspect_var.get()
-        if aspect == '16:9':
-            # Приводим к одной высоте
-            target_h = min_height
-            resized = [cv2.resize(frame, (int(frame.shape[1] * target_h / frame.shape[0]), target_h)) for frame in screenshots]
-        else:
-            # Приводим к одной ширине
-            target_w = min_width
-            resized = [cv2.resize(frame, (target_w, int(frame.shape[0] * target_w / frame.shape[1]))) for frame in screenshots]
-        # --- Собираем сетку ---
-        grid = []
-        for r in range(rows):
-            row_imgs = resized[r*cols:(r+1)*cols]
-            if not row_imgs:
-                continue
-            # Для каждой строки приводим к одной высоте (16:9) или ширине (9:16)
-            if aspect == '16:9':
-                h = min(img.shape[0] for img in row_imgs)
-                row_imgs = [cv2.resize(img, (int(img.shape[1] * h / img.shape[0]), h)) for img in row_imgs]
-                row = np.hstack(row_imgs)
-            else:
-                w = min(img.shape[1] for img in row_imgs)
-                row_imgs = [cv2.resize(img, (w, int(img.shape[0] * w / img.shape[1]))) for img in row_imgs]
-                row = np.vstack(row_imgs)
-            grid.append(row)
-        # Склеиваем строки/столбцы
-        if aspect == '16:9':
-            collage = np.vstack(grid)
-        else:
-            collage = np.hstack(grid)
-        # --- Вписываем в холст с нужным соотношением сторон ---
-        if aspect == '16:9':
-            target_w, target_h = 1920, 1080
-        else:
-            target_w, target_h = 1080, 1920
-        collage_pil = Image.fromarray(collage)
-        collage_pil.thumbnail((target_w, target_h), RESAMPLE)
-        result = Image.new('RGB', (target_w, target_h), (0, 0, 0))
-        x = (target_w - collage_pil.width) // 2
-        y = (target_h - collage_pil.height) // 2
-        result.paste(collage_pil, (x, y))
-        result.save(output_path, 'JPEG', quality=95)
+        # Пишем во временный файл, чтобы при остановке не оставался недописанный коллаж
+        tmp_path = output_path + ".part"
+        try:
+            if not core.create_aspect_collage(screenshots, tmp_path, self.aspect_var.get()):
+                return False
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         return True
         
     def process_videos_thread(self):
@@ -331,60 +539,139 @@ class VideoCollageGUI:
                 self.log_message("Нет видео файлов для обработки")
                 return
                 
-            total_files = len(self.video_files)
-            self.progress["maximum"] = total_files
             num_images = self.num_images_var.get()
-            for i, video_file in enumerate(self.video_files):
-                if not self.processing:  # Проверка на остановку
+            # Порядок обработки по оценке стоимости (длительность, разрешение, кодек, размер);
+            # "Как в списке" сохраняет текущую сортировку и фильтр списка
+            policy = next(p for p in SEQUENTIAL_POLICIES if POLICY_NAMES[p] == self.order_var.get())
+            try:
+                jobs = self.scheduler.make_jobs([os.path.join(video_path, f) for f in self.video_files],
+                                                num_images, known=self.known_jobs, check=self.check_cancel)
+            except ProcessingCancelled:
+                jobs = []
+            jobs = self.scheduler.order(jobs, policy)
+            for i, job in enumerate(jobs):
+                video_file = job.name
+                if self.stop_event.is_set():  # Проверка на остановку
                     break
+                # Следующее видео не прогревается, если все его кадры уже в кэше кадров
+                if i + 1 < len(jobs) and not self.frame_cache.covers(jobs[i + 1].path, num_images):
+                    self.prefetcher.prefetch(jobs[i + 1].path, num_images)
                     
                 self.status_var.set(f"Обработка: {video_file}")
                 self.log_message(f"Обрабатываю: {video_file}")
+                self.monitor.begin_video(video_file, num_images)
+                video_full_path = job.path
+                # Время без пауз: пауза внутри извлечения кадров не должна попасть в историю стоимости
+                started = self.monitor.active_time()
+                decoded_before = self.monitor.frames
+                created = False
                 
                 try:
-                    video_full_path = os.path.join(video_path, video_file)
-                    screenshots = self.extract_screenshots(video_full_path, num_images)
+                    substitutions = []
+                    screenshots = self.extract_screenshots(video_full_path, num_images, substitutions)
+                    if substitutions:
+                        self.log_message(f"⚠ Заменены нечитаемые кадры ({len(substitutions)}): "
+                                         f"{core.format_substitutions(substitutions)}")
                     
                     if len(screenshots) == num_images:
                         base_name = os.path.splitext(video_file)[0]
                         output_file = os.path.join(output_path, f"{base_name}.jpg")
                         
-                        if self.create_collage(screenshots, output_file):
+                        self.check_cancel()
+                        with self.monitor.stage("encode"):
+                            created = self.create_collage(screenshots, output_file)
+                        if created:
                             self.log_message(f"✅ Коллаж сохранен: {base_name}.jpg")
                         else:
                             self.log_message(f"❌ Ошибка создания коллажа для {video_file}")
                     else:
                         self.log_message(f"❌ Не удалось извлечь {num_images} скриншотов из {video_file}")
                         
+                except ProcessingCancelled:
+                    break
                 except Exception as e:
                     self.log_message(f"❌ Ошибка при обработке {video_file}: {str(e)}")
                 
-                self.progress["value"] = i + 1
-                self.root.update_idletasks()
+                try:
+                    file_size = os.path.getsize(video_full_path)
+                except OSError:
+                    file_size = 0
+                self.monitor.end_video(file_size)
+                # Учитываются только успешные видео; видео, целиком взятые из кэша кадров,
+                # не отражают реальную стоимость декодирования
+                if created and self.monitor.frames > decoded_before:
+                    self.scheduler.record(job, num_images, self.monitor.active_time() - started)
                 
-            self.status_var.set("Обработка завершена")
-            self.log_message("🎉 Обработка всех видео завершена!")
+            self.scheduler.cost_model.save()
+            if self.stop_event.is_set():
+                self.status_var.set("Обработка остановлена")
+                self.log_message("⏹ Обработка остановлена пользователем")
+            else:
+                self.status_var.set("Обработка завершена")
+                self.log_message("🎉 Обработка всех видео завершена!")
             
         except Exception as e:
             self.log_message(f"❌ Критическая ошибка: {str(e)}")
         finally:
             self.processing = False
-            self.process_btn.config(text="Создать коллажи")
+            self.resume_event.set()
+            self.process_btn.config(text="Создать коллажи", state="normal")
+            self.pause_btn.config(text="Пауза", state="disabled")
             self.refresh_btn.config(state="normal")
             
+    def stop_processing(self):
+        """Просит поток обработки остановиться при ближайшей проверке"""
+        self.stop_event.set()
+        self.resume_event.set()  # будим поток, если он на паузе
+        self.monitor.resume()
+        self.prefetcher.cancel()
+        self.process_btn.config(text="Останавливаю...", state="disabled")
+        self.pause_btn.config(state="disabled")
+        self.status_var.set("Остановка...")
+        
+    def toggle_pause(self):
+        """Приостанавливает или продолжает обработку"""
+        if not self.processing:
+            return
+        if self.resume_event.is_set():
+            self.resume_event.clear()
+            self.monitor.pause()  # время паузы не учитывается в оценке оставшегося времени
+            self.pause_btn.config(text="Продолжить")
+            self.status_var.set("Пауза")
+            self.log_message("⏸ Обработка приостановлена")
+        else:
+            self.monitor.resume()
+            self.resume_event.set()
+            self.pause_btn.config(text="Пауза")
+            self.log_message("▶ Обработка продолжена")
+            
     def start_processing(self):
-        """Запускает обработку видео"""
+        """Запускает обработку видео или останавливает текущую"""
         if self.processing:
+            self.stop_processing()
             return
             
+        # Обрабатываются файлы, прошедшие фильтр
+        entries = self.video_model.visible_entries()
+        self.video_files = [entry.name for entry in entries]
+        self.video_durations = {entry.name: entry.duration or 0 for entry in entries}
+        # Видео, параметры которых уже определены в фоне, повторно не открываются
+        self.known_jobs = {entry.path: entry.job for entry in entries if entry.job is not None}
         if not self.video_files:
             messagebox.showwarning("Предупреждение", "Нет видео файлов для обработки!")
             return
             
         self.processing = True
+        self.stop_event.clear()
+        self.resume_event.set()
         self.process_btn.config(text="Остановить")
+        self.pause_btn.config(text="Пауза", state="normal")
         self.refresh_btn.config(state="disabled")
+        self.progress["maximum"] = 100
         self.progress["value"] = 0
+        self.monitor.reset({f: self.video_durations.get(f, 0) for f in self.video_files})
+        self.prefetcher.budget_bytes = self.prefetch_mb_var.get() * 1024 * 1024
+        self.root.after(self.dashboard_interval_ms, self.update_dashboard)
         
         # Запускаем обработку в отдельном потоке
         thread = threading.Thread(target=self.process_videos_thread)
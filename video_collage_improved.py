@@ -1,27 +1,21 @@
 import os
 import sys
 import time
-try:
-    import cv2
-except ImportError:
-    print("Ошибка: Не удалось импортировать cv2. Установите: pip install opencv-python")
-    exit(1)
-try:
-    import numpy as np
-except ImportError:
-    print("Ошибка: Не удалось импортировать numpy. Установите: pip install numpy")
-    exit(1)
-try:
-    from PIL import Image
-except ImportError:
-    print("Ошибка: Не удалось импортировать PIL. Установите: pip install Pillow")
-    exit(1)
+import argparse
+
+from colager import core
+from colager.job_scheduler import JobScheduler, POLICY_NAMES, SEQUENTIAL_POLICIES, probe_video
+from colager.prefetch import Prefetcher
 
 class VideoCollageProcessor:
-    def __init__(self, video_folder="Video", output_folder="colage"):
+    def __init__(self, video_folder="Video", output_folder="colage", order="shortest", prefetch_mb=64):
         self.video_folder = video_folder
         self.output_folder = output_folder
         self.video_files = []
+        self.probed_jobs = {}  # путь -> VideoJob, считанный при сканировании
+        self.order = order  # fifo / shortest
+        self.scheduler = JobScheduler()
+        self.prefetcher = Prefetcher(budget_bytes=prefetch_mb * 1024 * 1024)
         
     def check_and_create_folders(self):
         """Проверяет наличие папок и создает их при необходимости"""
@@ -59,7 +53,7 @@ class VideoCollageProcessor:
             print(f"❌ Папка {self.video_folder} не существует")
             return False
             
-        video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv']
+        video_extensions = core.VIDEO_EXTENSIONS
         self.video_files = []
         
         for file in os.listdir(self.video_folder):
@@ -76,7 +70,10 @@ class VideoCollageProcessor:
         for i, file in enumerate(self.video_files, 1):
             file_path = os.path.join(self.video_folder, file)
             size = self.get_file_size(file_path)
-            duration = self.get_video_duration(file_path)
+            # Параметры видео сохраняются для планировщика, чтобы не открывать файл повторно
+            job = probe_video(file_path)
+            self.probed_jobs[file_path] = job
+            duration = job.duration
             duration_str = f"{duration:.1f}s" if duration > 0 else "Ошибка"
             print(f"   {i}. {file} ({size}, {duration_str})")
             
@@ -84,83 +81,19 @@ class VideoCollageProcessor:
         
     def get_file_size(self, file_path):
         """Получает размер файла в читаемом формате"""
-        size = os.path.getsize(file_path)
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+        return core.get_file_size(file_path)
         
     def get_video_duration(self, video_path):
         """Получает длительность видео в секундах"""
-        try:
-            cap = cv2.VideoCapture(video_path)
-            if not cap.isOpened():
-                return 0
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = frame_count / fps
-            cap.release()
-            return duration
-        except Exception:
-            return 0
+        return core.get_video_duration(video_path)
             
-    def extract_screenshots(self, video_path, num_screenshots=9):
+    def extract_screenshots(self, video_path, num_screenshots=9, substitutions=None):
         """Извлекает указанное количество скриншотов из видео"""
-        cap = cv2.VideoCapture(video_path)
-        
-        if not cap.isOpened():
-            return []
-        
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        frame_indices = []
-        for i in range(num_screenshots):
-            frame_index = int((i + 0.5) * total_frames / num_screenshots)
-            frame_indices.append(frame_index)
-        
-        screenshots = []
-        
-        for frame_index in frame_indices:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-            ret, frame = cap.read()
-            
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                screenshots.append(frame_rgb)
-        
-        cap.release()
-        return screenshots
+        return core.extract_screenshots(video_path, num_screenshots, substitutions)
         
     def create_collage(self, screenshots, output_path):
         """Создает коллаж из скриншотов 3x3"""
-        if len(screenshots) != 9:
-            return False
-        
-        base_height, base_width = screenshots[0].shape[:2]
-        target_size = min(base_width, base_height)
-        
-        collage_width = target_size * 3
-        collage_height = target_size * 3
-        collage = np.zeros((collage_height, collage_width, 3), dtype=np.uint8)
-        
-        for i, screenshot in enumerate(screenshots):
-            row = i // 3
-            col = i % 3
-            
-            resized = cv2.resize(screenshot, (target_size, target_size))
-            
-            y_start = row * target_size
-            y_end = (row + 1) * target_size
-            x_start = col * target_size
-            x_end = (col + 1) * target_size
-            
-            collage[y_start:y_end, x_start:x_end] = resized
-        
-        collage_pil = Image.fromarray(collage)
-        collage_pil.save(output_path, 'JPEG', quality=95)
-        
-        return True
+        return core.create_collage(screenshots, output_path)
         
     def process_videos(self):
         """Обрабатывает все видео файлы"""
@@ -170,12 +103,26 @@ class VideoCollageProcessor:
         successful = 0
         failed = 0
         
-        for i, video_file in enumerate(self.video_files, 1):
-            print(f"\n📹 [{i}/{len(self.video_files)}] Обрабатываю: {video_file}")
+        # Порядок обработки по оценке стоимости
+        jobs = self.scheduler.make_jobs([os.path.join(self.video_folder, f) for f in self.video_files],
+                                        known=self.probed_jobs)
+        jobs = self.scheduler.order(jobs, self.order)
+        print(f"   Порядок обработки: {POLICY_NAMES[self.order]}")
+        
+        for i, job in enumerate(jobs, 1):
+            if i < len(jobs):
+                self.prefetcher.prefetch(jobs[i].path, 9)
+            video_file = job.name
+            print(f"\n📹 [{i}/{len(jobs)}] Обрабатываю: {video_file}")
+            started = time.perf_counter()
+            succeeded = False
             
             try:
-                video_path = os.path.join(self.video_folder, video_file)
-                screenshots = self.extract_screenshots(video_path, 9)
+                video_path = job.path
+                substitutions = []
+                screenshots = self.extract_screenshots(video_path, 9, substitutions)
+                if substitutions:
+                    print(f"   ⚠ Заменены нечитаемые кадры: {core.format_substitutions(substitutions)}")
                 
                 if len(screenshots) == 9:
                     base_name = os.path.splitext(video_file)[0]
@@ -185,6 +132,7 @@ class VideoCollageProcessor:
                         output_size = self.get_file_size(output_path)
                         print(f"   ✅ Коллаж сохранен: {base_name}.jpg ({output_size})")
                         successful += 1
+                        succeeded = True
                     else:
                         print(f"   ❌ Ошибка создания коллажа для {video_file}")
                         failed += 1
@@ -195,7 +143,13 @@ class VideoCollageProcessor:
             except Exception as e:
                 print(f"   ❌ Ошибка при обработке {video_file}: {str(e)}")
                 failed += 1
+            
+            # Неудачные видео (не открылись, не прочитались) не отражают стоимость обработки
+            if succeeded:
+                self.scheduler.record(job, 9, time.perf_counter() - started)
                 
+        self.scheduler.cost_model.save()
+        
         print("\n" + "=" * 60)
         print(f"🎉 Обработка завершена!")
         print(f"   ✅ Успешно: {successful}")
@@ -223,7 +177,16 @@ class VideoCollageProcessor:
         return successful > 0
 
 def main():
-    processor = VideoCollageProcessor()
+    parser = argparse.ArgumentParser(description="Создание коллажей из видео (улучшенная консольная версия)")
+    parser.add_argument("--video-folder", default="Video", help="Папка с видео")
+    parser.add_argument("--output-folder", default="colage", help="Папка для коллажей")
+    parser.add_argument("--order", choices=SEQUENTIAL_POLICIES, default="shortest",
+                        help="Порядок обработки: как в папке или сначала короткие")
+    parser.add_argument("--prefetch-mb", type=int, default=64,
+                        help="Сколько МБ следующего видео прогревать заранее (0 — отключить)")
+    args = parser.parse_args()
+    
+    processor = VideoCollageProcessor(args.video_folder, args.output_folder, args.order, args.prefetch_mb)
     success = processor.run()
     
     if success:
@@ -0,0 +1,418 @@
+"""
+HTTP-сервис создания коллажей по запросу
+
+    GET /collage?path=<видео>&tiles=9&aspect=16:9  -> image/jpeg
+    GET /metrics                                   -> JSON с метриками
+
+Тяжелая работа (декодирование и сборка коллажа) выполняется в пуле процессов.
+Одновременные запросы с одинаковыми параметрами объединяются в одну задачу,
+а готовые коллажи хранятся в LRU-кэше (память + диск).
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+from colager.core import VIDEO_EXTENSIONS, extract_screenshots, create_aspect_collage, format_substitutions
+
+ALLOWED_TILES = (4, 6, 9, 12, 16)
+ALLOWED_ASPECTS = ("16:9", "9:16")
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+def render_collage(video_path, tiles, aspect):
+    """Извлекает кадры и возвращает JPEG коллажа в виде bytes (выполняется в пуле процессов)"""
+    substitutions = []
+    screenshots = extract_screenshots(video_path, tiles, substitutions)
+    if substitutions:
+        print(f"{video_path}: заменены нечитаемые кадры: {format_substitutions(substitutions)}")
+    if len(screenshots) != tiles:
+        raise RuntimeError(f"Не удалось извлечь {tiles} скриншотов (получено {len(screenshots)})")
+    buffer = io.BytesIO()
+    if not create_aspect_collage(screenshots, buffer, aspect):
+        raise RuntimeError("Ошибка создания коллажа")
+    return buffer.getvalue()
+
+
+class CollageCache:
+    """LRU-кэш готовых коллажей с ограничением размера в памяти и на диске"""
+
+    def __init__(self, cache_dir=None, max_memory_bytes=64 * 1024 * 1024, max_disk_bytes=1024 * 1024 * 1024):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()  # ключ -> bytes
+        self.memory_bytes = 0
+        self.cache_dir = cache_dir
+        self.disk = OrderedDict()  # имя файла -> размер
+        self.disk_bytes = 0
+        # get/put вызываются из пула потоков, чтобы дисковый ввод-вывод не блокировал цикл событий
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """Восстанавливает порядок LRU на диске по времени последнего доступа
+
+        Временные файлы записей, прерванных падением сервера, удаляются.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".jpg.tmp"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+                continue
+            if not name.endswith(".jpg"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self.disk[name] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    @staticmethod
+    def _file_name(key):
+        return hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".jpg"
+
+    def get(self, key):
+        """Возвращает (данные, "memory"/"disk") или (None, None)"""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        data = self.memory.get(key)
+        if data is not None:
+            self.memory.move_to_end(key)
+            return data, "memory"
+        if not self.cache_dir:
+            return None, None
+        name = self._file_name(key)
+        if name not in self.disk:
+            return None, None
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self.disk_bytes -= self.disk.pop(name)
+            return None, None
+        self.disk.move_to_end(name)
+        self._put_memory(key, data)
+        return data, "disk"
+
+    def put(self, key, data):
+        with self.lock:
+            self._put(key, data)
+
+    def _put(self, key, data):
+        self._put_memory(key, data)
+        if not self.cache_dir or len(data) > self.max_disk_bytes:
+            return
+        name = self._file_name(key)
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self.disk_bytes -= self.disk.pop(name, 0)
+        self.disk[name] = len(data)
+        self.disk_bytes += len(data)
+        self._evict_disk()
+
+    def _put_memory(self, key, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        self.memory_bytes -= len(self.memory.pop(key, b""))
+        self.memory[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, old = self.memory.popitem(last=False)
+            self.memory_bytes -= len(old)
+
+    def _evict_disk(self):
+        while self.disk_bytes > self.max_disk_bytes and self.disk:
+            name, size = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+
+class ServerMetrics:
+    """Счетчики, глубина очереди и задержки запросов"""
+
+    def __init__(self, window=1000):
+        self.started = time.time()
+        self.counters = {
+            "requests": 0,
+            "errors": 0,
+            "cache_hits_memory": 0,
+            "cache_hits_disk": 0,
+            "coalesced": 0,
+            "jobs_started": 0,
+            "jobs_failed": 0,
+        }
+        self.jobs_in_flight = 0
+        self.max_jobs_in_flight = 0
+        self.latencies = deque(maxlen=window)
+        self.job_times = deque(maxlen=window)
+
+    def incr(self, name):
+        self.counters[name] += 1
+
+    def job_started(self):
+        self.counters["jobs_started"] += 1
+        self.jobs_in_flight += 1
+        self.max_jobs_in_flight = max(self.max_jobs_in_flight, self.jobs_in_flight)
+
+    def job_finished(self, elapsed, failed=False):
+        self.jobs_in_flight -= 1
+        self.job_times.append(elapsed)
+        if failed:
+            self.counters["jobs_failed"] += 1
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return {"p50": None, "p95": None, "p99": None, "max": None}
+        ordered = sorted(values)
+
+        def pick(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(ordered[-1], 4)}
+
+    def snapshot(self, workers):
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": dict(self.counters),
+            "workers": workers,
+            "jobs_in_flight": self.jobs_in_flight,
+            "queue_depth": max(0, self.jobs_in_flight - workers),
+            "max_jobs_in_flight": self.max_jobs_in_flight,
+            "request_latency_s": self._percentiles(self.latencies),
+            "job_time_s": self._percentiles(self.job_times),
+        }
+
+
+class CollageServer:
+    def __init__(self, video_root="Video", cache=None, workers=None):
+        self.video_root = os.path.realpath(video_root)
+        self.cache = cache if cache is not None else CollageCache()
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = self._make_executor()
+        self.metrics = ServerMetrics()
+        self.inflight = {}  # ключ -> asyncio.Future
+
+    def _make_executor(self):
+        # spawn: при fork рабочие процессы унаследовали бы слушающий сокет и открытые
+        # соединения клиентов, и клиент не получал бы EOF после закрытия соединения
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _video_key(self, video_path, tiles, aspect):
+        stat = os.stat(video_path)
+        # В ключ входят размер и время изменения, чтобы перезаписанное видео не отдавалось из кэша
+        return (video_path, stat.st_size, stat.st_mtime_ns, tiles, aspect)
+
+    def resolve_video(self, rel_path):
+        """Проверяет, что путь указывает на видео внутри корневой папки"""
+        full_path = os.path.realpath(os.path.join(self.video_root, rel_path))
+        if os.path.commonpath([full_path, self.video_root]) != self.video_root:
+            return None
+        if not any(full_path.lower().endswith(ext) for ext in VIDEO_EXTENSIONS):
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        return full_path
+
+    async def get_collage(self, video_path, tiles, aspect):
+        # stat и чтение кэша с диска (в том числе сетевого) выполняются вне цикла событий
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(None, self._video_key, video_path, tiles, aspect)
+
+        data, source = await loop.run_in_executor(None, self.cache.get, key)
+        if data is not None:
+            self.metrics.incr("cache_hits_" + source)
+            return data
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.metrics.incr("coalesced")
+        else:
+            future = asyncio.ensure_future(self._run_job(key, video_path, tiles, aspect))
+            self.inflight[key] = future
+        # shield: отключение одного клиента не отменяет общую задачу
+        return await asyncio.shield(future)
+
+    async def _run_job(self, key, video_path, tiles, aspect):
+        loop = asyncio.get_running_loop()
+        self.metrics.job_started()
+        start = time.perf_counter()
+        failed = True
+        executor = self.executor
+        try:
+            try:
+                data = await loop.run_in_executor(executor, render_collage, video_path, tiles, aspect)
+            except BrokenProcessPool:
+                # Рабочий процесс упал (например, OpenCV на поврежденном файле): пул пересоздается,
+                # ошибку получает только эта задача
+                if self.executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = self._make_executor()
+                raise RuntimeError("Рабочий процесс аварийно завершился при обработке видео")
+            await loop.run_in_executor(None, self.cache.put, key, data)
+            failed = False
+            return data
+        finally:
+            self.metrics.job_finished(time.perf_counter() - start, failed)
+            self.inflight.pop(key, None)
+
+    async def handle_client(self, reader, writer):
+        start = time.perf_counter()
+        self.metrics.incr("requests")
+        try:
+            request_line = await reader.readline()
+            # Заголовки не используются, но их нужно дочитать
+            while True:
+                line = await reader.readline()
+                if not line or line in (b"\r\n", b"\n"):
+                    break
+            status, content_type, body = await self.dispatch(request_line)
+        except Exception as e:
+            status, content_type, body = 500, "text/plain; charset=utf-8", str(e).encode("utf-8")
+        if status >= 400:
+            self.metrics.incr("errors")
+        try:
+            header = (
+                f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(header.encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.metrics.latencies.append(time.perf_counter() - start)
+
+    async def dispatch(self, request_line):
+        parts = request_line.decode("latin-1").split()
+        if len(parts) < 2:
+            return 400, "text/plain; charset=utf-8", "Некорректный запрос".encode("utf-8")
+        method, target = parts[0], parts[1]
+        if method != "GET":
+            return 405, "text/plain; charset=utf-8", "Поддерживается только GET".encode("utf-8")
+
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            body = json.dumps(self.metrics.snapshot(self.workers), indent=2).encode("utf-8")
+            return 200, "application/json", body
+        if url.path != "/collage":
+            return 404, "text/plain; charset=utf-8", "Не найдено".encode("utf-8")
+
+        query = parse_qs(url.query)
+        rel_path = query.get("path", [""])[0]
+        aspect = query.get("aspect", ["16:9"])[0]
+        try:
+            tiles = int(query.get("tiles", ["9"])[0])
+        except ValueError:
+            tiles = None
+        if tiles not in ALLOWED_TILES:
+            return 400, "text/plain; charset=utf-8", f"tiles должен быть одним из {ALLOWED_TILES}".encode("utf-8")
+        if aspect not in ALLOWED_ASPECTS:
+            return 400, "text/plain; charset=utf-8", f"aspect должен быть одним из {ALLOWED_ASPECTS}".encode("utf-8")
+        loop = asyncio.get_running_loop()
+        video_path = await loop.run_in_executor(None, self.resolve_video, rel_path) if rel_path else None
+        if video_path is None:
+            return 404, "text/plain; charset=utf-8", f"Видео не найдено: {rel_path}".encode("utf-8")
+
+        try:
+            data = await self.get_collage(video_path, tiles, aspect)
+        except Exception as e:
+            return 500, "text/plain; charset=utf-8", f"Ошибка при обработке: {e}".encode("utf-8")
+        return 200, "image/jpeg", data
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Сервер запущен: http://{host}:{port}/ (папка с видео: {self.video_root})")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Отменяет задачи в очереди и прерывает процессы, которые еще декодируют видео"""
+        terminate_workers = getattr(self.executor, "terminate_workers", None)
+        if terminate_workers is not None:  # Python 3.14+
+            terminate_workers()
+            return
+        # shutdown() обнуляет _processes, поэтому список процессов берется заранее
+        processes = list((self.executor._processes or {}).values())
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(timeout=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP-сервис создания коллажей из видео")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--video-folder", default="Video", help="Корневая папка с видео")
+    parser.add_argument("--workers", type=int, default=None, help="Размер пула процессов")
+    parser.add_argument("--cache-dir", default=".collage_cache", help="Папка дискового кэша ('' — без диска)")
+    parser.add_argument("--memory-cache-mb", type=int, default=64)
+    parser.add_argument("--disk-cache-mb", type=int, default=1024)
+    args = parser.parse_args()
+
+    cache = CollageCache(
+        cache_dir=args.cache_dir or None,
+        max_memory_bytes=args.memory_cache_mb * 1024 * 1024,
+        max_disk_bytes=args.disk_cache_mb * 1024 * 1024,
+    )
+    server = CollageServer(args.video_folder, cache=cache, workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nСервер остановлен")
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())